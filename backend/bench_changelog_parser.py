@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Cursor changelog 解析器基准测试
+对比单遍解析器与旧的多策略解析器在保存的 HTML 样本上的耗时和解析结果
+
+旧解析器已从采集器中删除，这里保留一份冻结副本（需要 beautifulsoup4，
+未安装时只测单遍解析器），仅用于对比，不要在业务代码中引用
+
+用法:
+    python bench_changelog_parser.py [--rounds 50]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from collectors.changelog_parser import (
+    is_valid_cursor_version,
+    parse_changelog,
+    parse_changelog_date,
+)
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:  # pragma: no cover - 可选依赖
+    BeautifulSoup = None
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class LegacyChangelogParser:
+    """旧的多策略解析器（冻结副本，来自 CursorCollector._parse_versions_legacy）"""
+
+    def _parse_versions_legacy(self, soup: BeautifulSoup) -> List[Dict]:
+        """多策略解析版本信息（单遍解析器没有结果时的备用方案）"""
+        versions = []
+
+        try:
+            print("🔍 开始解析HTML页面...")
+
+            # 基于实际页面结构的解析策略
+            print("   🔄 查找版本信息...")
+
+            # 1. 查找所有日期
+            page_text = soup.get_text()
+            date_pattern = re.compile(r"([A-Za-z]+ \d+, \d{4})")
+            dates = date_pattern.findall(page_text)
+            print(f"   📅 找到 {len(dates)} 个日期: {dates}")
+
+            # 2. 智能版本号查找 - 多策略组合
+            valid_versions = []
+
+            # 策略1: 查找页面中明确标记的版本号（文本内容）
+            version_elements = soup.find_all(string=re.compile(r"^\d+\.\d+$"))
+            for element in version_elements:
+                version = element.strip()
+                if version and re.match(r"^\d+\.\d+$", version):
+                    if self._is_valid_cursor_version(version):
+                        valid_versions.append(version)
+
+            # 策略2: 智能元素搜索 - 基于语义而非特定标签
+            # 查找可能包含版本号的元素（不限于p标签）
+            potential_version_elements = soup.find_all(
+                lambda tag: tag.name in ["p", "span", "div", "h1", "h2", "h3", "strong"]
+                and tag.get_text().strip()
+                and re.match(r"^\d+\.\d+$", tag.get_text().strip())
+            )
+
+            for element in potential_version_elements:
+                version = element.get_text().strip()
+                if self._is_valid_cursor_version(version):
+                    # 验证上下文 - 确保是版本号而非其他数字
+                    if self._validate_version_context(element):
+                        valid_versions.append(version)
+
+            # 策略3: CSS选择器搜索 - 针对常见的版本号容器
+            version_selectors = [
+                # 常见的版本号容器模式
+                '[class*="version"]',
+                '[class*="tag"]',
+                '[class*="badge"]',
+                '[class*="label"]',
+                # 基于您提供的HTML结构
+                'div[class*="flex"] p',
+                'div[class*="items-center"] p',
+                # 通用的可能包含版本号的元素
+                'p:not([class*="text-"]):not([class*="description"])',
+            ]
+
+            for selector in version_selectors:
+                try:
+                    elements = soup.select(selector)
+                    for element in elements:
+                        text = element.get_text().strip()
+                        if re.match(
+                            r"^\d+\.\d+$", text
+                        ) and self._is_valid_cursor_version(text):
+                            valid_versions.append(text)
+                except Exception:
+                    continue
+
+            # 策略4: 如果以上方法找到的版本不够，使用文本模式匹配
+            if len(valid_versions) < 3:
+                print("   🔄 使用文本模式匹配策略...")
+                version_pattern = re.compile(r"\b(\d+\.\d+)\b")
+                version_matches = version_pattern.findall(page_text)
+
+                for version in version_matches:
+                    if self._is_valid_cursor_version(version):
+                        valid_versions.append(version)
+
+            # 去重并按版本号排序
+            unique_versions = list(set(valid_versions))
+            unique_versions.sort(
+                key=lambda x: [int(v) for v in x.split(".")], reverse=True
+            )
+
+            # 智能过滤：优先选择已知版本，同时支持新版本
+            filtered_versions = self._filter_cursor_versions(unique_versions)
+
+            # 限制版本数量，取前6个最新版本
+            unique_versions = filtered_versions[:6]
+
+            print(f"   🔢 找到 {len(unique_versions)} 个版本号: {unique_versions}")
+
+            # 3. 查找所有h2标签（版本标题）
+            h2_headers = soup.find_all("h2")
+            version_titles = []
+            for h2 in h2_headers:
+                title = h2.get_text().strip()
+                if title.lower() != "changelog":  # 跳过主标题
+                    version_titles.append(title)
+
+            print(f"   📄 找到 {len(version_titles)} 个版本标题")
+
+            # 4. 将版本号、日期和标题配对
+            version_info_pairs = []
+
+            # 确保我们有足够的数据来配对
+            min_count = min(len(unique_versions), len(dates), len(version_titles))
+
+            for i in range(min_count):
+                version_info_pairs.append(
+                    (unique_versions[i], dates[i], version_titles[i])
+                )
+
+            # 如果还有剩余的版本号，使用估算的数据
+            if len(unique_versions) > min_count:
+                for i in range(min_count, len(unique_versions)):
+                    version_info_pairs.append(
+                        (
+                            unique_versions[i],
+                            (
+                                dates[0] if dates else "January 1, 2025"
+                            ),  # 使用第一个日期或默认日期
+                            f"Cursor {unique_versions[i]} Update",
+                        )
+                    )
+
+            print(f"   📋 创建了 {len(version_info_pairs)} 个版本信息对")
+
+            # 5. 为每个版本创建详细信息
+            for i, (version_num, date, title) in enumerate(version_info_pairs):
+                try:
+                    print(f"   🔄 处理版本 {version_num}: {title[:50]}...")
+
+                    # 查找版本相关的内容
+                    content = self._find_version_content_by_title(soup, title)
+
+                    # 解析发布日期
+                    release_date = self._parse_date(date)
+
+                    version_info = {
+                        "version": version_num,
+                        "release_date": release_date,
+                        "title": title,
+                        "content": content,
+                    }
+
+                    versions.append(version_info)
+                    print(f"   ✅ 版本 {version_num} 处理成功")
+
+                except Exception as e:
+                    print(f"   ❌ 版本 {version_num} 处理失败: {e}")
+                    continue
+
+            print(f"   ✅ 成功解析 {len(versions)} 个版本")
+
+            # 如果解析失败，使用备用数据
+            if not versions:
+                print("   ⚠️ 解析失败，使用备用数据...")
+                versions = self._get_fallback_versions()
+
+            return versions
+
+        except Exception as e:
+            print(f"   ❌ 解析HTML失败: {e}")
+            print("   🔄 使用备用数据")
+            return self._get_fallback_versions()
+
+    def _find_version_content_by_title(self, soup: BeautifulSoup, title: str) -> str:
+        """根据标题查找版本相关的内容"""
+        try:
+            content_parts = []
+
+            # 查找标题对应的h2元素
+            h2_element = soup.find("h2", string=title)
+            if not h2_element:
+                # 尝试模糊匹配
+                h2_elements = soup.find_all("h2")
+                for h2 in h2_elements:
+                    if title in h2.get_text():
+                        h2_element = h2
+                        break
+
+            if h2_element:
+                # 查找该h2元素后面的内容
+                current = h2_element
+
+                # 向后查找兄弟元素
+                for sibling in current.find_next_siblings():
+                    # 如果遇到下一个h2，停止
+                    if sibling.name == "h2":
+                        break
+
+                    # 收集h3标签内容
+                    if sibling.name == "h3":
+                        h3_text = sibling.get_text().strip()
+                        if h3_text and len(h3_text) > 3:
+                            content_parts.append(h3_text)
+
+                    # 收集段落内容
+                    elif sibling.name == "p":
+                        p_text = sibling.get_text().strip()
+                        if p_text and len(p_text) > 10:
+                            content_parts.append(p_text)
+
+                    # 收集div内容
+                    elif sibling.name == "div":
+                        div_text = sibling.get_text().strip()
+                        if div_text and len(div_text) > 10:
+                            # 查找功能相关的内容
+                            if any(
+                                keyword in div_text.lower()
+                                for keyword in [
+                                    "agent",
+                                    "planning",
+                                    "context",
+                                    "tab",
+                                    "memory",
+                                    "search",
+                                    "improvement",
+                                    "feature",
+                                    "better",
+                                    "faster",
+                                    "new",
+                                    "background",
+                                    "slack",
+                                    "to-do",
+                                    "todo",
+                                    "queued",
+                                    "messages",
+                                    "pr",
+                                    "indexing",
+                                    "embeddings",
+                                    "semantic",
+                                    "merge",
+                                    "conflicts",
+                                    "bugbot",
+                                    "mcp",
+                                    "pricing",
+                                    "rules",
+                                    "terminal",
+                                    "images",
+                                ]
+                            ):
+                                content_parts.append(div_text)
+
+                    # 限制内容数量
+                    if len(content_parts) >= 10:
+                        break
+
+            # 如果没有找到足够内容，尝试通用搜索
+            if len(content_parts) < 3:
+                # 搜索包含标题关键词的内容
+                title_keywords = title.lower().split()
+                all_elements = soup.find_all(["h3", "p", "div"])
+
+                for element in all_elements:
+                    text = element.get_text().strip()
+                    if len(text) > 10:
+                        # 如果文本包含标题中的关键词
+                        if any(keyword in text.lower() for keyword in title_keywords):
+                            content_parts.append(text)
+                            if len(content_parts) >= 8:
+                                break
+
+            # 返回内容
+            if content_parts:
+                return "\n".join(content_parts[:8])  # 返回前8个内容
+            else:
+                return f"New features and improvements: {title}"
+
+        except Exception as e:
+            print(f"   ❌ 查找内容失败: {e}")
+            return f"New features and improvements: {title}"
+
+    def _is_valid_cursor_version(self, version: str) -> bool:
+        """验证是否是有效的Cursor版本号"""
+        return is_valid_cursor_version(version)
+
+    def _validate_version_context(self, element) -> bool:
+        """验证版本号的上下文，确保是真正的版本号而非其他数字"""
+        try:
+            # 检查元素的父容器和兄弟元素
+            parent = element.parent
+            if not parent:
+                return True  # 如果没有父元素，默认有效
+
+            # 获取周围的文本内容
+            surrounding_text = ""
+
+            # 检查前后的兄弟元素
+            prev_sibling = element.previous_sibling
+            if prev_sibling:
+                surrounding_text += str(prev_sibling)
+
+            next_sibling = element.next_sibling
+            if next_sibling:
+                surrounding_text += str(next_sibling)
+
+            # 检查父元素的文本
+            if parent:
+                surrounding_text += parent.get_text()
+
+            # 转换为小写进行关键词检查
+            context_text = surrounding_text.lower()
+
+            # 版本号相关的关键词
+            version_keywords = [
+                "version",
+                "v",
+                "release",
+                "update",
+                "cursor",
+                "changelog",
+                "july",
+                "june",
+                "may",
+                "april",
+                "march",
+                "february",
+                "january",
+                "2024",
+                "2025",
+                "agent",
+                "planning",
+                "feature",
+                "improvement",
+            ]
+
+            # 非版本号的关键词（排除这些）
+            non_version_keywords = [
+                "price",
+                "cost",
+                "dollar",
+                "usd",
+                "payment",
+                "billing",
+                "width",
+                "height",
+                "size",
+                "pixel",
+                "px",
+                "rem",
+                "em",
+                "rating",
+                "star",
+                "score",
+                "percentage",
+                "%",
+            ]
+
+            # 如果包含非版本号关键词，返回False
+            for keyword in non_version_keywords:
+                if keyword in context_text:
+                    return False
+
+            # 如果包含版本号关键词，返回True
+            for keyword in version_keywords:
+                if keyword in context_text:
+                    return True
+
+            # 如果没有明确的关键词，检查是否在合理的HTML结构中
+            # 版本号通常在特定的容器中
+            parent_classes = parent.get("class", []) if parent else []
+            parent_class_str = " ".join(parent_classes).lower()
+
+            # 常见的版本号容器类名
+            version_container_keywords = [
+                "version",
+                "tag",
+                "badge",
+                "label",
+                "release",
+                "update",
+                "flex",
+                "items-center",
+                "card",
+                "container",
+            ]
+
+            for keyword in version_container_keywords:
+                if keyword in parent_class_str:
+                    return True
+
+            # 默认情况下，如果没有明确的反对理由，认为是有效的
+            return True
+
+        except Exception:
+            # 如果验证过程出错，默认认为有效
+            return True
+
+    def _filter_cursor_versions(self, versions: List[str]) -> List[str]:
+        """智能过滤和排序Cursor版本号"""
+        filtered_versions = []
+
+        # 已知的Cursor版本号（按优先级排序）
+        known_cursor_versions = [
+            "1.2",
+            "1.1",
+            "1.0",  # 1.x 系列
+            "0.50",
+            "0.49",
+            "0.48",
+            "0.47",
+            "0.46",
+            "0.45",  # 0.x 系列
+        ]
+
+        # 首先添加已知版本（按优先级）
+        for known_version in known_cursor_versions:
+            if known_version in versions:
+                filtered_versions.append(known_version)
+
+        # 然后添加未知但符合格式的新版本
+        for version in versions:
+            if version not in filtered_versions:
+                parts = version.split(".")
+                major, minor = int(parts[0]), int(parts[1])
+
+                # 支持未来的版本号
+                if (major == 1 and minor >= 0) or (major == 0 and minor >= 40):
+                    filtered_versions.append(version)
+
+        # 按版本号排序（降序）
+        filtered_versions.sort(
+            key=lambda x: [int(v) for v in x.split(".")], reverse=True
+        )
+
+        return filtered_versions
+
+    def _parse_date(self, date_str: str) -> str:
+        """解析日期字符串为ISO格式"""
+        return parse_changelog_date(date_str)
+
+    def _get_fallback_versions(self) -> List[Dict]:
+        """原实现在解析失败时返回内置的备用版本，基准测试中返回空列表以暴露失败"""
+        return []
+
+
+def parse_legacy(html: str) -> List[Dict]:
+    """多策略解析器（包含 BeautifulSoup 建树时间）"""
+    soup = BeautifulSoup(html, "html.parser")
+    return LegacyChangelogParser()._parse_versions_legacy(soup)
+
+
+def bench(func, html: str, rounds: int) -> float:
+    """返回平均每次解析耗时（毫秒）"""
+    # 多策略解析器会打印大量调试信息，计时期间屏蔽输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(html)  # 预热
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(html)
+        elapsed = time.perf_counter() - start
+    return elapsed / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="changelog 解析器基准测试")
+    parser.add_argument("--rounds", type=int, default=50, help="每个样本的解析次数")
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    if not fixtures:
+        print(f"❌ 未找到 HTML 样本: {FIXTURE_DIR}")
+        return
+
+    print("🚀 Cursor changelog 解析器基准测试")
+    print("=" * 60)
+    if BeautifulSoup is None:
+        print("⚠️ 未安装 beautifulsoup4，跳过多策略解析器对比")
+
+    for path in fixtures:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+
+        single_versions = parse_changelog(html)
+        single_ms = bench(parse_changelog, html, args.rounds)
+
+        print(f"📄 {os.path.basename(path)} ({len(html) / 1024:.1f} KB)")
+        print(
+            f"   单遍解析:   {single_ms:8.2f} ms  "
+            f"版本 {[v['version'] for v in single_versions]}"
+        )
+        if not single_versions:
+            print("   ⚠️ 单遍解析未解析出任何版本")
+
+        if BeautifulSoup is not None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy_versions = parse_legacy(html)
+            legacy_ms = bench(parse_legacy, html, args.rounds)
+
+            print(
+                f"   多策略解析: {legacy_ms:8.2f} ms  "
+                f"版本 {[v['version'] for v in legacy_versions]}"
+            )
+            print(f"   ⚡ 加速比: {legacy_ms / single_ms:.1f}x")
+            if [v["version"] for v in legacy_versions] != [
+                v["version"] for v in single_versions
+            ]:
+                print("   ⚠️ 两种解析器得到的版本列表不一致")
+            else:
+                # 逐字段比较，统计每个字段不一致的版本数
+                mismatched = {
+                    field: sum(
+                        single.get(field) != legacy.get(field)
+                        for single, legacy in zip(single_versions, legacy_versions)
+                    )
+                    for field in ("release_date", "title", "content")
+                }
+                mismatched = {k: v for k, v in mismatched.items() if v}
+                if mismatched:
+                    summary = "，".join(
+                        f"{field} {count}/{len(single_versions)}"
+                        for field, count in mismatched.items()
+                    )
+                    print(f"   ⚠️ 版本列表一致，部分字段不一致: {summary}")
+                else:
+                    print("   ✅ 两种解析器的输出完全一致")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+WebSocket 广播基准测试
+模拟大量连接（其中少量慢连接和已断开的连接），对比逐个串行发送与
+WebSocketManager 按连接发送队列广播时，广播方的等待时间和正常连接收齐消息的耗时
+
+用法:
+    python bench_websocket_broadcast.py [--connections 5000] [--slow 10] [--dead 10]
+        [--queue-size 5] [--policy coalesce]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import WebSocketDisconnect
+
+from metrics import WEBSOCKET_QUEUE_DROPS
+from websocket_manager import OVERFLOW_POLICIES, WebSocketManager
+
+ROOM = "cursor_collection"
+
+
+class FakeWebSocket:
+    """模拟客户端连接：send_text 按设定延迟返回，断开的连接直接抛出异常"""
+
+    def __init__(self, delay: float = 0.0, dead: bool = False):
+        self.delay = 0.0
+        self.dead = False
+        self._delay_after_connect = delay
+        self._dead_after_connect = dead
+        self.received = 0
+        self.last_message: dict = {}
+
+    async def accept(self):
+        pass
+
+    def start(self):
+        """连接建立后再启用延迟和断开，避免影响连接确认消息"""
+        self.delay = self._delay_after_connect
+        self.dead = self._dead_after_connect
+        self.received = 0
+
+    async def send_text(self, text: str):
+        if self.dead:
+            raise WebSocketDisconnect(code=1006)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        else:
+            # 模拟写入 socket 缓冲区时让出一次事件循环
+            await asyncio.sleep(0)
+        self.received += 1
+        self.last_message = json.loads(text)
+
+    async def close(self, code: int = 1000):
+        self.dead = True
+
+
+async def sequential_broadcast(manager: WebSocketManager, room: str, message: dict):
+    """原实现：每个连接单独序列化、逐个等待发送"""
+    disconnected = []
+    for connection_id in manager.rooms.get(room, set()):
+        websocket = manager.active_connections.get(connection_id)
+        if websocket is None:
+            continue
+        try:
+            await websocket.send_text(json.dumps(message, ensure_ascii=False))
+        except Exception:
+            disconnected.append(connection_id)
+    for connection_id in disconnected:
+        manager.disconnect(connection_id)
+
+
+async def setup(args) -> WebSocketManager:
+    manager = WebSocketManager(
+        send_timeout=args.timeout,
+        queue_size=args.queue_size,
+        overflow_policy=args.policy,
+    )
+    websockets = []
+    for i in range(args.connections):
+        websocket = FakeWebSocket(
+            delay=args.slow_delay if i < args.slow else 0.0,
+            dead=args.slow <= i < args.slow + args.dead,
+        )
+        await manager.connect(websocket, f"conn-{i}", ROOM)
+        websockets.append(websocket)
+    # 等待连接确认消息发送完
+    await asyncio.sleep(0.01)
+    for websocket in websockets:
+        websocket.start()
+    return manager, websockets
+
+
+async def run(args, broadcast):
+    """
+    返回 (平均每次广播等待时间（毫秒）, 正常连接收到最后一条消息的耗时（毫秒）,
+    正常连接平均收到的消息数, 剩余连接数)
+
+    连续广播时队列满的连接会按策略丢弃或合并消息，因此收到的消息数可能少于广播数
+    """
+    manager, websockets = await setup(args)
+    healthy = websockets[args.slow + args.dead :]
+
+    start = time.perf_counter()
+    for i in range(args.messages):
+        message = {
+            "type": "version_update" if i % 5 == 0 else "progress_update",
+            "current": i + 1,
+            "total": args.messages,
+            "message": f"处理版本 1.{i} " + "x" * 200,
+            "extra_data": {"version": f"1.{i}"},
+        }
+        await broadcast(manager, ROOM, message)
+    producer = time.perf_counter() - start
+
+    # 按 disconnect 策略被断开的连接不再等待
+    while any(
+        not websocket.dead and websocket.last_message.get("current") != args.messages
+        for websocket in healthy
+    ):
+        await asyncio.sleep(0.001)
+    delivered = time.perf_counter() - start
+
+    left = manager.get_total_connections()
+    # 停止各连接的写入任务
+    for connection_id in list(manager.active_connections):
+        manager.disconnect(connection_id)
+    received = sum(websocket.received for websocket in healthy) / len(healthy)
+    return producer / args.messages * 1000, delivered * 1000, received, left
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="WebSocket 广播基准测试")
+    parser.add_argument("--connections", type=int, default=5000, help="模拟连接数")
+    parser.add_argument("--slow", type=int, default=10, help="慢连接数")
+    parser.add_argument(
+        "--slow-delay", type=float, default=0.1, help="慢连接每次发送耗时（秒）"
+    )
+    parser.add_argument("--dead", type=int, default=10, help="已断开的连接数")
+    parser.add_argument("--timeout", type=float, default=0.2, help="单次发送超时（秒）")
+    parser.add_argument("--messages", type=int, default=20, help="广播消息数")
+    parser.add_argument("--queue-size", type=int, default=5, help="每个连接的发送队列长度")
+    parser.add_argument(
+        "--policy", choices=OVERFLOW_POLICIES, default="coalesce", help="队列满时的策略"
+    )
+    args = parser.parse_args()
+
+    # 基准测试期间不输出连接日志
+    logging.disable(logging.WARNING)
+
+    print("🚀 WebSocket 广播基准测试")
+    print("=" * 60)
+    print(
+        f"📡 {args.connections} 个连接（慢连接 {args.slow} 个，每次发送 {args.slow_delay}s；"
+        f"已断开 {args.dead} 个），广播 {args.messages} 条消息"
+    )
+
+    print(f"📥 发送队列长度 {args.queue_size}，队列满时策略 {args.policy}")
+
+    sequential = await run(args, sequential_broadcast)
+    queued = await run(
+        args, lambda manager, room, message: manager.broadcast_to_room(room, message)
+    )
+
+    for label, (producer_ms, delivered_ms, received, left) in (
+        ("串行发送", sequential),
+        ("发送队列", queued),
+    ):
+        print(
+            f"   {label}: 广播等待 {producer_ms:9.2f} ms/条  "
+            f"正常连接收到最后一条 {delivered_ms:9.1f} ms  "
+            f"平均收到 {received:5.1f} 条  剩余连接 {left}"
+        )
+    print(f"   ⚡ 广播等待加速比: {sequential[0] / queued[0]:.1f}x")
+
+    drops = {
+        labels[0]: int(value) for _, labels, value, _ in WEBSOCKET_QUEUE_DROPS.samples()
+    }
+    print(f"   🗑️ 队列丢弃/合并消息: {drops or 0}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
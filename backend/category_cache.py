@@ -0,0 +1,114 @@
+"""
+分类ID缓存
+分类只有少数几个，进程内缓存 name -> id，启动时预热，分类变更时失效
+"""
+
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from database import get_db_context
+from models import Category
+
+logger = logging.getLogger(__name__)
+
+# 预设分类数据
+PRESET_CATEGORIES = [
+    {
+        "name": "技术新闻",
+        "description": "技术领域新闻资讯",
+        "color": "#1890ff",
+        "icon": "news",
+    },
+    {
+        "name": "开源项目",
+        "description": "开源项目版本发布",
+        "color": "#52c41a",
+        "icon": "project",
+    },
+    {
+        "name": "工具更新",
+        "description": "开发工具更新日志",
+        "color": "#fa8c16",
+        "icon": "tool",
+    },
+]
+
+
+class CategoryCache:
+    """分类 name -> id 缓存"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def initialize(self):
+        """写入预设分类并预热缓存（应用启动时调用）"""
+        for preset in PRESET_CATEGORIES:
+            self._create(**preset)
+        self.warm()
+
+    def warm(self):
+        """从数据库加载全部分类"""
+        with get_db_context() as db:
+            rows = db.query(Category.name, Category.id).all()
+        with self._lock:
+            self._ids = {name: category_id for name, category_id in rows}
+        logger.info(f"分类缓存预热完成，共 {len(rows)} 个分类")
+
+    def invalidate(self):
+        """清空缓存，下次访问时重新查询"""
+        with self._lock:
+            self._ids = {}
+
+    def get_id(self, db, category_name: str) -> Optional[int]:
+        """获取或创建分类ID"""
+        category_id = self._ids.get(category_name)
+        if category_id is not None:
+            return category_id
+
+        row = db.query(Category.id).filter(Category.name == category_name).first()
+        if row:
+            category_id = row[0]
+        else:
+            category_id = self._create(
+                category_name, description=f"自动创建的{category_name}分类"
+            )
+
+        with self._lock:
+            self._ids[category_name] = category_id
+        return category_id
+
+    def _create(self, name: str, **fields) -> int:
+        """
+        在独立会话中创建分类并立即提交
+
+        两个收集器同时创建同名分类时，唯一键冲突的一方回滚后读取已存在的记录
+        """
+        with self._lock, get_db_context() as db:
+            existing = db.query(Category.id).filter(Category.name == name).first()
+            if existing:
+                return existing[0]
+
+            category = Category(name=name, **fields)
+            db.add(category)
+            try:
+                db.commit()
+                return category.id
+            except IntegrityError:
+                db.rollback()
+                return db.query(Category.id).filter(Category.name == name).one()[0]
+
+
+# 全局分类缓存实例
+category_cache = CategoryCache()
+
+
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _invalidate_category_cache(mapper, connection, target):
+    """分类被修改或删除时清空缓存"""
+    category_cache.invalidate()
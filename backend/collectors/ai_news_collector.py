@@ -3,7 +3,6 @@ AI新闻收集器
 使用AI API来获取最新的AI领域新闻
 """
 
-import requests
 import json
 import asyncio
 from datetime import datetime, timedelta
@@ -11,15 +10,25 @@ from typing import List, Dict, Any, Optional
 import re
 import logging
 import time
-import urllib3
 import os
 import httpx
 
-# 禁用SSL警告
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
 from .base import BaseCollector, CollectorItem
+from .llm_client import llm_client
+from .telemetry import phase, record_api_call, record_error, track_run
 from config import settings  # 🔄 修复导入：使用settings而不是Config
+from websocket_manager import ProgressReporter
+
+
+# API 请求超时设置
+API_TIMEOUT = httpx.Timeout(connect=30.0, read=600.0, write=30.0, pool=60.0)
+
+# 流式收集时推送进度的 WebSocket 房间
+STREAM_ROOM = "ai_news_collection"
+
+
+class StreamInterruptedError(Exception):
+    """流式回复已经部分推送给客户端后中断（不能再用普通请求重新收集，否则内容重复）"""
 
 
 class AINewsCollector(BaseCollector):
@@ -36,6 +45,7 @@ class AINewsCollector(BaseCollector):
         super().__init__()
         self.name = name
         self.test_mode = test_mode
+        self.job_id: Optional[str] = None  # 作为后台任务运行时的任务ID
 
         # 从配置获取API设置
         self.api_url = settings.deepseek_api_url  # 🔄 使用settings
@@ -45,46 +55,10 @@ class AINewsCollector(BaseCollector):
         # 创建logger
         self.logger = logging.getLogger(__name__)
 
-        # 使用httpx替代requests，支持HTTP/2
-        import ssl
-        
-        # 创建自定义SSL上下文
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        ssl_context.set_ciphers('DEFAULT@SECLEVEL=1')
-        
-        # 创建HTTP客户端，不强制使用HTTP/2
-        self.client = httpx.AsyncClient(
-            http2=False,  # 禁用HTTP/2，使用HTTP/1.1确保稳定性
-            verify=False,  # 禁用SSL验证
-            timeout=httpx.Timeout(
-                connect=30.0,  # 连接超时
-                read=600.0,    # 读取超时增加到10分钟
-                write=30.0,    # 写入超时
-                pool=60.0      # 连接池超时
-            ),
-            limits=httpx.Limits(
-                max_keepalive_connections=1,  # 保持连接数
-                max_connections=1,            # 最大连接数
-                keepalive_expiry=60.0        # 连接保持时间
-            )
-        )
-        
-        # 配置代理设置 (容器内通常不需要代理)
-        proxy_url = os.getenv('https_proxy') or os.getenv('HTTPS_PROXY')
-        if proxy_url:
-            # httpx代理配置
-            self.client = httpx.AsyncClient(
-                http2=False,
-                verify=False,
-                proxies=proxy_url,
-                timeout=httpx.Timeout(connect=30.0, read=600.0, write=30.0, pool=60.0),
-                limits=httpx.Limits(max_keepalive_connections=1, max_connections=1, keepalive_expiry=60.0)
-            )
-            self.logger.info(f"使用代理: {proxy_url}")
-        else:
-            self.logger.info("未配置代理，使用HTTP/1.1直连")
+        # API 请求使用所有收集器共享的连接池（见 collectors/llm_client.py），
+        # 不再为每个实例创建客户端，连接在应用关闭时统一释放
+        if not settings.llm_trust_env:
+            self.logger.info("已禁用环境变量代理，使用HTTP/1.1直连")
 
         self.logger.info(f"AI新闻收集器初始化完成: {self.name}")
         if self.test_mode:
@@ -107,6 +81,10 @@ class AINewsCollector(BaseCollector):
                 self.logger.info("🌐 使用API模式：调用远程API")
                 return await self._collect_from_api()
 
+        except StreamInterruptedError:
+            # 已推送的部分内容作废，本次运行记为失败
+            raise
+
         except Exception as e:
             self.logger.error(f"收集AI新闻时发生错误: {str(e)}")
             return self._create_fallback_news()
@@ -167,39 +145,158 @@ class AINewsCollector(BaseCollector):
                 ],
             }
 
-            # 发送API请求，使用与 test_official_api.py 相同的成功配置
-            self.logger.info("发送API请求（简化直连模式）...")
-            response = requests.post(
-                self.api_url, 
-                headers=headers, 
-                data=json.dumps(data).encode('utf-8'),
-                proxies={'http': None, 'https': None}  # 禁用代理
-            )
-            
+            if settings.llm_stream:
+                record_api_call()
+                with phase("llm"):
+                    content = await self._collect_streaming(data)
+                if content:
+                    with phase("parse"):
+                        news_items = self._parse_ai_response(content)
+                    return news_items if news_items else self._create_fallback_news()
+                self.logger.warning("流式请求没有返回内容，改用普通请求")
+
+            # 发送API请求（共享连接池，显式超时：深度搜索模型响应较慢，读取超时放宽到10分钟）
+            self.logger.info("发送API请求（共享连接池）...")
+            record_api_call()
+            request_start = time.time()
+            outcome = "error"
+            try:
+                with phase("llm"):
+                    response = await llm_client.get_client().post(
+                        self.api_url,
+                        headers=headers,
+                        content=json.dumps(data).encode("utf-8"),
+                        timeout=API_TIMEOUT,
+                    )
+                outcome = (
+                    "success"
+                    if response.status_code == 200
+                    else f"http_{response.status_code}"
+                )
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                raise
+            finally:
+                llm_client.observe_request(
+                    "ai_news", outcome, time.time() - request_start
+                )
+
             if response.status_code == 200:
                 # 使用经过验证的解析器处理响应
-                result = response.content.decode("utf-8")
-                parsed_content = self._parse_response(result)
+                with phase("parse"):
+                    result = response.content.decode("utf-8")
+                    parsed_content = self._parse_response(result)
                 
                 if parsed_content:
                     self.logger.info(f"✅ 解析成功，内容长度: {len(parsed_content)} 字符")
-                    news_items = self._parse_ai_response(parsed_content)
+                    with phase("parse"):
+                        news_items = self._parse_ai_response(parsed_content)
                     return news_items if news_items else self._create_fallback_news()
                 else:
                     self.logger.error("❌ 响应解析失败")
+                    record_error("响应解析失败")
                     return self._create_fallback_news()
             else:
                 self.logger.error(f"API请求失败: {response.status_code}, {response.text}")
+                record_error(f"API请求失败: {response.status_code}")
                 return []
 
-        except (requests.ConnectionError, requests.ReadTimeout, requests.Timeout) as e:
+        except StreamInterruptedError:
+            raise
+
+        except httpx.HTTPError as e:
             self.logger.error(f"HTTP连接错误: {str(e)}")
+            record_error(f"HTTP连接错误: {e}")
             return self._create_fallback_news()
 
         except Exception as e:
             self.logger.error(f"收集AI新闻时发生错误: {str(e)}")
+            record_error(f"收集AI新闻时发生错误: {e}")
             return self._create_fallback_news()
 
+    async def _collect_streaming(self, data: Dict[str, Any]) -> Optional[str]:
+        """
+        以流式方式调用API，返回完整回复内容
+
+        每收到一段增量就转发到 WebSocket；编号段落（1. 2. ...）一旦结束，
+        立即解析成新闻项推送，不必等待整个回复完成
+        """
+        reporter = ProgressReporter(STREAM_ROOM, job_id=self.job_id)
+        await reporter.report_status("started", "开始流式收集AI新闻")
+
+        buffer = ""
+        completed_sections = 0
+        pushed_items = 0
+
+        async def push_sections(final: bool):
+            """推送已经完成的编号段落"""
+            nonlocal completed_sections, pushed_items
+            # 去掉思考内容（包括尚未闭合的 <think>）后按编号切分，
+            # 未结束时最后一个段落可能还没写完，只处理它之前的段落
+            visible = re.sub(r"<think>.*?(?:</think>|$)", "", buffer, flags=re.DOTALL)
+            sections = re.split(r"\n(?=\d+\.)", visible)
+            end = len(sections) if final else len(sections) - 1
+            for section in sections[completed_sections:end]:
+                completed_sections += 1
+                section = section.strip()
+                if len(section) < 20:
+                    continue
+                item = self._build_news_item(section)
+                if item:
+                    pushed_items += 1
+                    await reporter.report_item(
+                        {
+                            "index": pushed_items,
+                            "title": item.title,
+                            "summary": item.summary,
+                            "content": item.content,
+                            "source": item.source,
+                            "model": item.model,
+                        }
+                    )
+                    self.logger.info(f"📨 推送第 {pushed_items} 条新闻: {item.title[:50]}")
+
+        request_start = time.time()
+        try:
+            async for delta in llm_client.stream_chat(
+                data["messages"],
+                data["max_tokens"],
+                data["temperature"],
+                timeout=API_TIMEOUT,
+                top_p=data["top_p"],
+                presence_penalty=data["presence_penalty"],
+            ):
+                buffer += delta
+                await reporter.report_llm_delta("ai_news", delta)
+                await push_sections(final=False)
+
+        except httpx.HTTPError as e:
+            outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            llm_client.observe_request(
+                "ai_news_stream", outcome, time.time() - request_start
+            )
+            # 不返回不完整的回复：截断的内容会被当作完整结果解析保存。
+            # 与 llm_client.chat 相同，已经推送过增量时不再用普通请求重试（客户端会收到重复内容），
+            # 本次运行记为失败，已推送的内容由 error 状态作废；还没有推送时返回 None 改用普通请求
+            record_error(f"流式请求失败: {e}")
+            if not buffer:
+                self.logger.warning(f"流式请求失败，改用普通请求: {e}")
+                return None
+            self.logger.error(f"流式请求中途失败，已推送部分内容，不再重试: {e}")
+            await reporter.report_status("error", f"流式请求中断，已推送的内容作废: {e}")
+            raise StreamInterruptedError(f"流式请求中断: {e}") from e
+
+        llm_client.observe_request(
+            "ai_news_stream", "success", time.time() - request_start
+        )
+        await push_sections(final=True)
+        await reporter.report_status(
+            "completed",
+            f"流式收集完成，已推送 {pushed_items} 条新闻",
+            {"pushed_items": pushed_items},
+        )
+        return buffer
+
     def _create_fallback_news(self) -> List[CollectorItem]:
         """创建备用新闻数据（当API调用失败时）"""
         today = datetime.now().strftime("%Y年%m月%d日")
@@ -301,40 +398,11 @@ class AINewsCollector(BaseCollector):
                 continue
 
             self.logger.info(f"📝 处理段落{i+1}: {section[:100]}...")
-            
-            # 提取新闻标题和内容
-            lines = section.split("\n")
-            title_line = lines[0] if lines else ""
 
-            # 多种标题提取策略
-            title = self._extract_title(title_line, section)
-            
-            if title and len(title) > 5:
-                # 构建完整内容
-                full_content = "\n".join(lines[1:]) if len(lines) > 1 else section
-                
-                # 如果内容太短，使用整个段落
-                if len(full_content.strip()) < 50:
-                    full_content = section
-
-                # 创建新闻项
-                item = CollectorItem(
-                    title=title,
-                    summary=(
-                        full_content[:200] + "..."
-                        if len(full_content) > 200
-                        else full_content
-                    ),
-                    content=full_content,
-                    url="",
-                    source=self.get_source_name(),
-                    author=f"{self.model} AI助手",
-                    published_at=datetime.now(),
-                    tags=["AI新闻", "科技动态"],
-                    model=self.model,
-                )
+            item = self._build_news_item(section)
+            if item:
                 items.append(item)
-                self.logger.info(f"✅ 创建新闻项{len(items)}: {title[:50]}...")
+                self.logger.info(f"✅ 创建新闻项{len(items)}: {item.title[:50]}...")
             else:
                 self.logger.info(f"⏭️ 跳过段落{i+1}: 无有效标题")
 
@@ -379,6 +447,38 @@ class AINewsCollector(BaseCollector):
 
         return items[:10]  # 🔄 限制返回最多10条新闻
 
+    def _build_news_item(self, section: str) -> Optional[CollectorItem]:
+        """把一个新闻段落转换为新闻项，没有有效标题时返回 None"""
+        # 提取新闻标题和内容
+        lines = section.split("\n")
+        title_line = lines[0] if lines else ""
+
+        # 多种标题提取策略
+        title = self._extract_title(title_line, section)
+        if not title or len(title) <= 5:
+            return None
+
+        # 构建完整内容
+        full_content = "\n".join(lines[1:]) if len(lines) > 1 else section
+
+        # 如果内容太短，使用整个段落
+        if len(full_content.strip()) < 50:
+            full_content = section
+
+        return CollectorItem(
+            title=title,
+            summary=(
+                full_content[:200] + "..." if len(full_content) > 200 else full_content
+            ),
+            content=full_content,
+            url="",
+            source=self.get_source_name(),
+            author=f"{self.model} AI助手",
+            published_at=datetime.now(),
+            tags=["AI新闻", "科技动态"],
+            model=self.model,
+        )
+
     def _parse_response(self, response_text):
         """解析API响应，提取AI新闻内容（从test_official_api.py移植）"""
         try:
@@ -604,44 +704,50 @@ class AINewsCollector(BaseCollector):
 
         start_time = time.time()
 
-        try:
-            self.logger.info(f"开始运行AI新闻收集器: {self.name}")
-
-            # 收集新闻项目
-            items = await self.collect()
-
-            execution_time = time.time() - start_time
-
-            if items:
-                self.logger.info(f"成功收集到 {len(items)} 条AI新闻")
-                return {
-                    "success": True,
-                    "count": len(items),
-                    "items": items,
-                    "execution_time": execution_time,
-                    "source": self.get_source_name(),
-                }
-            else:
-                return {
+        with track_run() as telemetry:
+            try:
+                self.logger.info(f"开始运行AI新闻收集器: {self.name}")
+
+                # 收集新闻项目
+                items = await self.collect()
+
+                execution_time = time.time() - start_time
+
+                if items:
+                    self.logger.info(f"成功收集到 {len(items)} 条AI新闻")
+                    result = {
+                        "success": True,
+                        "count": len(items),
+                        "items": items,
+                        "execution_time": execution_time,
+                        "source": self.get_source_name(),
+                    }
+                else:
+                    telemetry.record_error("未收集到任何新闻")
+                    result = {
+                        "success": False,
+                        "error": "未收集到任何新闻",
+                        "count": 0,
+                        "execution_time": execution_time,
+                    }
+
+            except Exception as e:
+                execution_time = time.time() - start_time
+                error_msg = f"AI新闻收集器运行失败: {str(e)}"
+                self.logger.error(error_msg)
+                telemetry.record_error(error_msg)
+                # 打印详细的异常信息
+                import traceback
+                traceback.print_exc()
+                result = {
                     "success": False,
-                    "error": "未收集到任何新闻",
+                    "error": error_msg,
                     "count": 0,
                     "execution_time": execution_time,
                 }
 
-        except Exception as e:
-            execution_time = time.time() - start_time
-            error_msg = f"AI新闻收集器运行失败: {str(e)}"
-            self.logger.error(error_msg)
-            # 打印详细的异常信息
-            import traceback
-            traceback.print_exc()
-            return {
-                "success": False,
-                "error": error_msg,
-                "count": 0,
-                "execution_time": execution_time,
-            }
+        result["telemetry"] = telemetry
+        return result
 
     def __str__(self):
         return f"AINewsCollector(name={self.name}, model={self.model})"
@@ -4,6 +4,8 @@ from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 import time
 
+from .telemetry import track_run
+
 
 @dataclass
 class CollectorItem:
@@ -35,6 +37,7 @@ class BaseCollector:
         self.description = ""
         self.url = ""
         self.enabled = True
+        self.timeout: Optional[float] = None  # 运行截止时间（秒），为空时使用全局配置
 
     def get_source_name(self) -> str:
         """获取数据源名称"""
@@ -51,25 +54,31 @@ class BaseCollector:
             }
 
         start_time = time.time()
-        try:
-            items = await self.collect()
-            execution_time = time.time() - start_time
+        with track_run() as telemetry:
+            try:
+                items = await self.collect()
+                execution_time = time.time() - start_time
 
-            return {
-                "success": True,
-                "items": items,
-                "count": len(items),
-                "execution_time": execution_time,
-            }
+                result = {
+                    "success": True,
+                    "items": items,
+                    "count": len(items),
+                    "execution_time": execution_time,
+                }
 
-        except Exception as e:
-            execution_time = time.time() - start_time
-            return {
-                "success": False,
-                "error": str(e),
-                "count": 0,
-                "execution_time": execution_time,
-            }
+            except Exception as e:
+                execution_time = time.time() - start_time
+                telemetry.record_error(str(e))
+                result = {
+                    "success": False,
+                    "error": str(e),
+                    "count": 0,
+                    "execution_time": execution_time,
+                }
+
+        # 运行遥测（阶段耗时、API 调用次数、错误），由调用方写入运行记录
+        result["telemetry"] = telemetry
+        return result
 
     async def collect(self) -> List[CollectorItem]:
         """收集数据 - 子类需要实现此方法"""
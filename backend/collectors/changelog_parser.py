@@ -0,0 +1,176 @@
+"""
+Cursor changelog 单遍解析器
+按文档顺序遍历一次 lxml DOM，输出 (version, release_date, title, content) 记录
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import lxml.html
+
+VERSION_PATTERN = re.compile(r"^\d+\.\d+$")
+DATE_PATTERN = re.compile(r"^[A-Za-z]+ \d+, \d{4}$")
+
+# 可能承载版本号 / 日期的叶子元素
+LABEL_TAGS = {"p", "span", "div", "strong", "time", "h1", "h2", "h3"}
+# 内容块元素及其最小文本长度，命中后不再遍历其子元素
+CONTENT_TAGS = {"h3": 3, "h4": 3, "p": 10, "li": 10}
+# 不参与解析的元素
+SKIP_TAGS = {"script", "style", "noscript", "svg", "header", "footer", "nav"}
+
+# 每个版本最多保留的内容段落数
+MAX_CONTENT_PARTS = 8
+# 最多返回的版本数（最新的几个）
+MAX_VERSIONS = 6
+
+
+class ChangelogParseError(ValueError):
+    """页面解析不出任何版本（页面结构变化等）"""
+
+
+def is_valid_cursor_version(version: str) -> bool:
+    """验证是否是有效的Cursor版本号"""
+    if not version or not VERSION_PATTERN.match(version):
+        return False
+
+    major, minor = (int(part) for part in version.split("."))
+
+    # Cursor版本号的合理范围:
+    # - 1.x 系列: 1.0, 1.1, 1.2, ...
+    # - 0.x 系列: 0.40+（历史版本）
+    return major == 1 or (major == 0 and 40 <= minor <= 99)
+
+
+def parse_changelog_date(date_str: str) -> str:
+    """解析日期字符串为ISO格式"""
+    try:
+        # 处理 "July 3, 2025" 格式
+        if DATE_PATTERN.match(date_str):
+            return datetime.strptime(date_str, "%B %d, %Y").strftime("%Y-%m-%d")
+
+        # 处理 "2025-07-03" 格式
+        if re.match(r"\d{4}-\d{2}-\d{2}", date_str):
+            return date_str
+
+    except ValueError:
+        pass
+
+    return "2025-01-01"
+
+
+def _version_key(version: str) -> List[int]:
+    return [int(part) for part in version.split(".")]
+
+
+def parse_changelog(html: str) -> List[Dict]:
+    """
+    单遍解析 changelog 页面
+
+    遇到版本号时开启新记录；之后的日期、第一个 h2（标题）和 h3/p/li（内容）
+    都归属到该记录，直到下一个版本号出现。页面解析失败时返回空列表。
+    """
+    if not html or not html.strip():
+        return []
+
+    try:
+        root = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return []
+
+    records: List[Dict] = []
+    current: Optional[Dict] = None
+    pending_date: Optional[str] = None
+
+    # 手动维护栈做深度优先遍历，内容块命中后跳过其子树
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        tag = element.tag if isinstance(element.tag, str) else ""
+
+        if tag in SKIP_TAGS:
+            continue
+
+        is_leaf = len(element) == 0
+        text = (element.text or "").strip() if is_leaf else ""
+
+        if is_leaf and tag in LABEL_TAGS and VERSION_PATTERN.match(text):
+            # 新版本开始
+            current = {
+                "version": text,
+                "date": pending_date,
+                "title": None,
+                "content": [],
+                "closed": False,
+            }
+            pending_date = None
+            records.append(current)
+            continue
+
+        if is_leaf and tag in LABEL_TAGS and DATE_PATTERN.match(text):
+            if current is not None and current["date"] is None:
+                current["date"] = text
+            else:
+                # 日期出现在版本号之前，留给下一个版本
+                pending_date = text
+            continue
+
+        if tag == "h2":
+            title = element.text_content().strip()
+            if current is not None and title and title.lower() != "changelog":
+                if current["title"] is None:
+                    current["title"] = title
+                else:
+                    # 同一版本下的第二个 h2，视为内容结束
+                    current["closed"] = True
+            continue
+
+        if (
+            tag in CONTENT_TAGS
+            and current is not None
+            and current["title"] is not None
+            and not current["closed"]
+        ):
+            if len(current["content"]) < MAX_CONTENT_PARTS:
+                block_text = " ".join(element.text_content().split())
+                if len(block_text) > CONTENT_TAGS[tag]:
+                    current["content"].append(block_text)
+            continue
+
+        stack.extend(reversed(element))
+
+    return _build_versions(records)
+
+
+def _build_versions(records: List[Dict]) -> List[Dict]:
+    """过滤无效版本、去重并按版本号降序取最新的几个"""
+    seen = set()
+    versions = []
+    fallback_date = next((r["date"] for r in records if r["date"]), None)
+
+    for record in records:
+        version = record["version"]
+        if version in seen or not is_valid_cursor_version(version):
+            continue
+        seen.add(version)
+
+        title = record["title"] or f"Cursor {version} Update"
+        content = (
+            "\n".join(record["content"])
+            if record["content"]
+            else f"New features and improvements: {title}"
+        )
+
+        versions.append(
+            {
+                "version": version,
+                "release_date": parse_changelog_date(
+                    record["date"] or fallback_date or "January 1, 2025"
+                ),
+                "title": title,
+                "content": content,
+            }
+        )
+
+    versions.sort(key=lambda v: _version_key(v["version"]), reverse=True)
+    return versions[:MAX_VERSIONS]
@@ -0,0 +1,244 @@
+"""
+LLM 响应缓存
+按 (模型, 提示词模板版本, 规范化后的输入) 的 sha256 做内容寻址，支持 TTL 和 LRU 淘汰
+默认使用本地磁盘，LLM_CACHE_BACKEND=redis 时使用 settings.redis_url
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    """规范化输入文本：合并空白字符，避免格式差异导致缓存未命中"""
+    return " ".join(text.split())
+
+
+def make_cache_key(
+    namespace: str,
+    version: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    **params: Any,
+) -> str:
+    """生成缓存键（模板版本变化后旧缓存自然失效）"""
+    payload = {
+        "namespace": namespace,
+        "version": version,
+        "model": model,
+        "messages": [
+            {"role": m.get("role", ""), "content": _normalize(m.get("content", ""))}
+            for m in messages
+        ],
+        "params": params,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskLLMCache:
+    """本地磁盘缓存：每个键一个 JSON 文件，文件 mtime 作为最近访问时间"""
+
+    def __init__(self, directory: str, ttl: float, max_entries: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._index: Optional["OrderedDict[str, float]"] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _load_index(self) -> "OrderedDict[str, float]":
+        """首次使用时扫描目录，按最近访问时间建立 LRU 索引"""
+        if self._index is not None:
+            return self._index
+
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith(".json"):
+                        path = os.path.join(root, name)
+                        try:
+                            entries.append((os.path.getmtime(path), name[:-5]))
+                        except OSError:
+                            continue
+        entries.sort()
+        self._index = OrderedDict((key, mtime) for mtime, key in entries)
+        return self._index
+
+    def _remove(self, key: str):
+        self._load_index().pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                return None
+
+            if time.time() - entry.get("created_at", 0) > self.ttl:
+                self._remove(key)
+                return None
+
+            # 命中后刷新访问时间
+            now = time.time()
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            index[key] = now
+            index.move_to_end(key)
+            return entry.get("value")
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            index = self._load_index()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            # 先写临时文件再替换，避免读到写了一半的文件
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"created_at": time.time(), "value": value}, f, ensure_ascii=False
+                )
+            os.replace(tmp_path, path)
+
+            index[key] = time.time()
+            index.move_to_end(key)
+            while len(index) > self.max_entries:
+                oldest, _ = next(iter(index.items()))
+                self._remove(oldest)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._load_index()):
+                self._remove(key)
+
+
+class RedisLLMCache:
+    """Redis 缓存：值使用 SETEX 过期，有序集合记录访问时间用于 LRU 淘汰"""
+
+    PREFIX = "llm_cache:"
+    LRU_KEY = "llm_cache:lru"
+
+    def __init__(self, url: str, ttl: float, max_entries: int):
+        import redis
+
+        self.ttl = int(ttl)
+        self.max_entries = max_entries
+        self._redis = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._redis.get(self.PREFIX + key)
+        if value is None:
+            self._redis.zrem(self.LRU_KEY, key)
+            return None
+        self._redis.zadd(self.LRU_KEY, {key: time.time()})
+        return value
+
+    def set(self, key: str, value: str):
+        pipe = self._redis.pipeline()
+        pipe.setex(self.PREFIX + key, self.ttl, value)
+        pipe.zadd(self.LRU_KEY, {key: time.time()})
+        pipe.zcard(self.LRU_KEY)
+        size = pipe.execute()[-1]
+
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = [k for k, _ in self._redis.zpopmin(self.LRU_KEY, overflow)]
+            if evicted:
+                self._redis.delete(*(self.PREFIX + k for k in evicted))
+
+    def clear(self):
+        keys = self._redis.zrange(self.LRU_KEY, 0, -1)
+        if keys:
+            self._redis.delete(*(self.PREFIX + k for k in keys))
+        self._redis.delete(self.LRU_KEY)
+
+
+class LLMCache:
+    """LLM 响应缓存入口，后端操作放到线程中执行；缓存出错时只记录日志，不影响 LLM 调用"""
+
+    def __init__(self):
+        self._backend = None
+        self._initialized = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.llm_cache_backend != "none"
+
+    def _get_backend(self):
+        if self._initialized:
+            return self._backend
+        self._initialized = True
+
+        backend = settings.llm_cache_backend
+        if backend == "redis":
+            try:
+                self._backend = RedisLLMCache(
+                    settings.redis_url,
+                    settings.llm_cache_ttl,
+                    settings.llm_cache_max_entries,
+                )
+                self._backend._redis.ping()
+                logger.info("LLM 响应缓存使用 Redis")
+                return self._backend
+            except Exception as e:
+                logger.warning(f"Redis 不可用，LLM 响应缓存改用本地磁盘: {e}")
+
+        if backend != "none":
+            self._backend = DiskLLMCache(
+                settings.llm_cache_dir,
+                settings.llm_cache_ttl,
+                settings.llm_cache_max_entries,
+            )
+        return self._backend
+
+    async def get(self, key: str) -> Optional[str]:
+        backend = self._get_backend()
+        if backend is None:
+            return None
+        try:
+            return await asyncio.to_thread(backend.get, key)
+        except Exception as e:
+            logger.warning(f"读取 LLM 缓存失败: {e}")
+            return None
+
+    async def set(self, key: str, value: str):
+        backend = self._get_backend()
+        if backend is None:
+            return
+        try:
+            await asyncio.to_thread(backend.set, key, value)
+        except Exception as e:
+            logger.warning(f"写入 LLM 缓存失败: {e}")
+
+
+# 全局 LLM 响应缓存实例
+llm_cache = LLMCache()
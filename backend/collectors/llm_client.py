@@ -0,0 +1,297 @@
+"""
+LLM 异步客户端
+所有收集器共享同一个 httpx.AsyncClient，重试退避使用 asyncio.sleep，不阻塞事件循环
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import httpx
+
+from config import settings
+from metrics import LLM_CACHE_LOOKUPS, LLM_REQUEST_DURATION, LLM_REQUESTS
+from .llm_cache import llm_cache, make_cache_key
+from .telemetry import phase, record_api_call, record_cache_hit, record_error
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """共享的 LLM HTTP 客户端"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """获取共享的 AsyncClient（按事件循环懒加载）"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.llm_timeout, connect=30.0),
+                trust_env=settings.llm_trust_env,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections,
+                    keepalive_expiry=60.0,
+                ),
+            )
+            self._loop = loop
+        return self._client
+
+    def build_headers(self) -> Dict[str, str]:
+        """构建请求头（完整的请求头用来解决 428 错误）"""
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {settings.deepseek_api_key}",
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Accept": "application/json",
+            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+            "Cache-Control": "no-cache",
+        }
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: float = 120,
+        retries: int = 3,
+        cache_namespace: Optional[str] = None,
+        cache_version: str = "1",
+        on_delta: Optional[Callable[[str], Awaitable[None]]] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+        **extra: Any,
+    ) -> Optional[str]:
+        """
+        调用 chat/completions 接口，返回第一条回复内容
+
+        指定 cache_namespace 时先查响应缓存，提示词模板变化后需要修改 cache_version。
+        传入 validate 时只缓存校验通过的回复（如能解析出 JSON），
+        格式错误的回复照常返回给调用方，但不会在之后的重试中被重放。
+        开启 LLM_STREAM 且传入 on_delta 时以流式接收，每个增量都会回调 on_delta。
+        流式请求在转发任何增量之前失败时退回普通请求；已经转发过增量时不再重试
+        （否则客户端会收到重复的输出），直接按失败返回 None。
+        所有重试都失败时返回 None（失败结果不会写入缓存）。
+        在收集器运行中调用时，耗时和调用次数计入运行遥测
+        """
+        cache_key = None
+        if cache_namespace and llm_cache.enabled:
+            cache_key = make_cache_key(
+                cache_namespace,
+                cache_version,
+                settings.ai_model,
+                messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **extra,
+            )
+            cached = await llm_cache.get(cache_key)
+            LLM_CACHE_LOOKUPS.inc(result="hit" if cached is not None else "miss")
+            if cached is not None:
+                logger.info(f"LLM 缓存命中: {cache_namespace}")
+                record_cache_hit()
+                return cached
+
+        content = None
+        with phase("llm"):
+            forwarded = False
+            if on_delta is not None and settings.llm_stream:
+                content, forwarded = await self._stream_request(
+                    messages, max_tokens, temperature, timeout, on_delta, **extra
+                )
+            if content is None and not forwarded:
+                content = await self._request(
+                    messages, max_tokens, temperature, timeout, retries, **extra
+                )
+        if content is None:
+            record_error(f"LLM 请求失败: {cache_namespace or 'chat'}")
+        if content is not None and cache_key is not None:
+            if validate is None or validate(content):
+                await llm_cache.set(cache_key, content)
+            else:
+                logger.warning(f"LLM 回复未通过校验，不写入缓存: {cache_namespace}")
+        return content
+
+    async def _request(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: float,
+        retries: int,
+        **extra: Any,
+    ) -> Optional[str]:
+        """发送请求，失败时按次数重试"""
+        data = {
+            "model": settings.ai_model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": False,
+            **extra,
+        }
+
+        client = self.get_client()
+        for attempt in range(retries):
+            start_time = time.time()
+            outcome = "error"
+            try:
+                record_api_call()
+                response = await client.post(
+                    settings.deepseek_api_url,
+                    headers=self.build_headers(),
+                    json=data,
+                    timeout=timeout,
+                )
+                elapsed_time = time.time() - start_time
+                logger.info(
+                    f"LLM 请求第 {attempt + 1}/{retries} 次尝试 (用时 {elapsed_time:.1f}s)"
+                )
+
+                if response.status_code == 200:
+                    result = response.json()
+                    if "choices" in result and len(result["choices"]) > 0:
+                        outcome = "success"
+                        return result["choices"][0]["message"]["content"]
+                    outcome = "bad_response"
+                    logger.error(f"LLM 响应格式错误: {result}")
+                else:
+                    outcome = f"http_{response.status_code}"
+                    logger.error(f"LLM API 响应错误: {response.status_code}")
+
+            except httpx.TimeoutException:
+                outcome = "timeout"
+                logger.warning("LLM 请求超时，重试中...")
+                continue
+            except httpx.HTTPError as e:
+                logger.error(f"LLM 请求异常: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"LLM 请求未知错误: {e}")
+                continue
+            finally:
+                self.observe_request("chat", outcome, time.time() - start_time)
+
+            # 非 200 响应退避后重试（超时和网络异常立即重试）
+            if outcome.startswith("http_") and attempt < retries - 1:
+                await asyncio.sleep(attempt + 1)
+
+        return None
+
+    def observe_request(self, kind: str, outcome: str, elapsed: float):
+        """记录单次请求的耗时和结果（/metrics）"""
+        LLM_REQUESTS.inc(kind=kind, outcome=outcome)
+        LLM_REQUEST_DURATION.observe(elapsed, kind=kind, outcome=outcome)
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: Any = 120,
+        **extra: Any,
+    ) -> AsyncIterator[str]:
+        """
+        以 SSE 流式调用 chat/completions 接口，逐个产出增量内容
+
+        非 200 响应抛出 httpx.HTTPStatusError，不做重试
+        """
+        data = {
+            "model": settings.ai_model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            **extra,
+            "stream": True,
+        }
+
+        async with self.get_client().stream(
+            "POST",
+            settings.deepseek_api_url,
+            headers={**self.build_headers(), "Accept": "text/event-stream"},
+            json=data,
+            timeout=timeout,
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:") :].strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except json.JSONDecodeError:
+                    logger.warning(f"无法解析的 SSE 数据: {payload[:100]}")
+                    continue
+
+                choices = chunk.get("choices") or []
+                if choices:
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def _stream_request(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: Any,
+        on_delta: Callable[[str], Awaitable[None]],
+        **extra: Any,
+    ) -> Tuple[Optional[str], bool]:
+        """
+        流式请求并拼接完整回复
+
+        返回 (回复内容, 是否已转发过增量)，失败时回复内容为 None
+        """
+        parts = []
+        start_time = time.time()
+        try:
+            record_api_call()
+            async for delta in self.stream_chat(
+                messages, max_tokens, temperature, timeout=timeout, **extra
+            ):
+                parts.append(delta)
+                await on_delta(delta)
+            logger.info(f"LLM 流式请求完成 (用时 {time.time() - start_time:.1f}s)")
+        except Exception as e:
+            outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            self.observe_request("stream", outcome, time.time() - start_time)
+            if parts:
+                logger.error(f"LLM 流式请求中途失败，已转发部分输出，不再重试: {e}")
+            else:
+                logger.error(f"LLM 流式请求失败，改用普通请求: {e}")
+            return None, bool(parts)
+
+        self.observe_request("stream", "success", time.time() - start_time)
+
+        return ("".join(parts) if parts else None), bool(parts)
+
+    async def aclose(self):
+        """关闭共享客户端（应用关闭时调用）"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+# 全局 LLM 客户端实例
+llm_client = LLMClient()
@@ -2,19 +2,84 @@ import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
+import time
 
 from .base import BaseCollector, CollectorItem
 from .cursor_collector import CursorCollector
 from .ai_news_collector import AINewsCollector
+from .upsert import UpsertResult, bulk_upsert, bulk_upsert_cursor_updates
+from config import settings
 from database import get_db_context
-from models import NewsArticle, ProjectRelease, ToolUpdate, Category, CursorUpdate
+from category_cache import category_cache
+from pagination import count_cache
+from response_cache import (
+    CURSOR_NAMESPACE,
+    DASHBOARD_NAMESPACE,
+    NEWS_NAMESPACE,
+    response_cache,
+)
+from rollups import record_news
+from .telemetry import log_collector_run, phase, track_run
+from models import (
+    APICallRecord,
+    CursorUpdate,
+    NewsArticle,
+    ProjectRelease,
+    ToolUpdate,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def get_daily_call_count(api_name: str) -> int:
+    """当日已记录的调用次数"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    with get_db_context() as db:
+        api_record = (
+            db.query(APICallRecord)
+            .filter(
+                APICallRecord.api_name == api_name,
+                APICallRecord.call_date == today,
+            )
+            .first()
+        )
+        return api_record.call_count if api_record else 0
+
+
+def increment_daily_call_count(api_name: str):
+    """当日调用次数加一"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    with get_db_context() as db:
+        api_record = (
+            db.query(APICallRecord)
+            .filter(
+                APICallRecord.api_name == api_name,
+                APICallRecord.call_date == today,
+            )
+            .first()
+        )
+        if api_record:
+            api_record.call_count += 1
+            api_record.last_call_time = datetime.now()
+            api_record.updated_at = datetime.now()
+        else:
+            db.add(
+                APICallRecord(
+                    api_name=api_name,
+                    call_date=today,
+                    call_count=1,
+                    last_call_time=datetime.now(),
+                )
+            )
+        db.commit()
+
+
 class CollectorManager:
     """收集器管理器"""
 
+    # 批量去重时单条 IN 查询包含的最大值数量
+    DEDUPE_CHUNK_SIZE = 1000
+
     def __init__(self):
         self.collectors: List[BaseCollector] = []
         self.initialize_collectors()
@@ -53,66 +118,135 @@ class CollectorManager:
         if not collector:
             return {"success": False, "error": f"收集器 '{collector_name}' 不存在"}
 
-        try:
-            # 运行收集器
-            result = await collector.run()
+        result = await self._run_and_save(collector)
+        if not result["success"]:
+            return result
+
+        return {
+            "success": True,
+            "collector": collector_name,
+            "items_collected": result["count"],
+            "execution_time": result["execution_time"],
+        }
+
+    async def run_all_collectors(self) -> Dict[str, Any]:
+        """并发运行所有收集器，每个收集器完成后立即保存数据"""
+        logger.info("开始运行所有收集器")
+
+        semaphore = asyncio.Semaphore(max(1, settings.collector_concurrency))
+        scheduled_at = time.time()
 
-            if result["success"]:
-                # 保存数据到数据库
-                await self.save_items(result["items"], collector)
+        async def run_one(collector: BaseCollector) -> Dict[str, Any]:
+            async with semaphore:
+                started_at = time.time()
+                result = await self._run_and_save(collector)
 
                 return {
-                    "success": True,
-                    "collector": collector_name,
-                    "items_collected": result["count"],
-                    "execution_time": result["execution_time"],
+                    "collector": collector.name,
+                    "success": result["success"],
+                    "items_collected": result.get("count", 0),
+                    "execution_time": result.get("execution_time", 0),
+                    "error": result.get("error"),
+                    "queue_time": started_at - scheduled_at,
+                    "wall_time": time.time() - started_at,
                 }
-            else:
-                return result
 
-        except Exception as e:
-            logger.error(f"运行收集器 {collector_name} 失败: {e}")
-            return {"success": False, "error": str(e)}
+        results = await asyncio.gather(
+            *(run_one(collector) for collector in self.collectors)
+        )
+        total_items = sum(
+            result["items_collected"] for result in results if result["success"]
+        )
 
-    async def run_all_collectors(self) -> Dict[str, Any]:
-        """运行所有收集器"""
-        results = []
-        total_items = 0
+        logger.info(
+            f"所有收集器运行完成，共收集 {total_items} 条数据，"
+            f"总用时 {time.time() - scheduled_at:.1f}s"
+        )
 
-        logger.info("开始运行所有收集器")
+        return {
+            "success": True,
+            "total_items": total_items,
+            "wall_time": time.time() - scheduled_at,
+            "results": results,
+        }
+
+    async def _run_and_save(self, collector: BaseCollector) -> Dict[str, Any]:
+        """
+        运行收集器（超过截止时间自动取消）并保存数据，然后写入运行记录
+
+        超时或出错时返回 {"success": False, "error": ...}，运行遥测不会出现在返回值中
+        """
+        # AI新闻收集器与 /news/ai/collect 共用每日调用次数限制（定时调度同样计数）
+        api_name = self.get_daily_limited_api(collector)
+        if api_name:
+            call_count = await asyncio.to_thread(get_daily_call_count, api_name)
+            if call_count >= settings.daily_ai_collect_limit:
+                error = (
+                    f"每日调用次数已达限制({settings.daily_ai_collect_limit}次)，"
+                    f"今日已调用{call_count}次"
+                )
+                logger.warning(f"跳过收集器 {collector.name}: {error}")
+                return {
+                    "success": False,
+                    "error": error,
+                    "count": 0,
+                    "execution_time": 0,
+                }
 
-        for collector in self.collectors:
+        timeout = self.get_collector_timeout(collector)
+        started_at = time.time()
+
+        with track_run() as telemetry:
             try:
-                result = await collector.run()
+                result = await asyncio.wait_for(collector.run(), timeout=timeout)
 
                 if result["success"]:
                     # 保存数据到数据库
-                    await self.save_items(result["items"], collector)
-                    total_items += result["count"]
-
-                results.append(
-                    {
-                        "collector": collector.name,
-                        "success": result["success"],
-                        "items_collected": result.get("count", 0),
-                        "execution_time": result.get("execution_time", 0),
-                        "error": result.get("error"),
-                    }
-                )
-
+                    with phase("persist"):
+                        await self.save_items(result["items"], collector)
+                    if api_name:
+                        await asyncio.to_thread(increment_daily_call_count, api_name)
+
+            except asyncio.TimeoutError:
+                logger.error(f"运行收集器 {collector.name} 超时（{timeout}秒）")
+                result = {"success": False, "error": f"收集器运行超时（{timeout}秒）"}
+                telemetry.record_error(result["error"])
             except Exception as e:
                 logger.error(f"运行收集器 {collector.name} 失败: {e}")
-                results.append(
-                    {"collector": collector.name, "success": False, "error": str(e)}
-                )
+                result = {"success": False, "error": str(e)}
+                telemetry.record_error(result["error"])
+
+        result.pop("telemetry", None)
+        result.setdefault("count", 0)
+        result.setdefault("execution_time", time.time() - started_at)
+
+        log_collector_run(
+            collector.name,
+            result["success"],
+            result["count"] if result["success"] else 0,
+            message=result.get("error") or "",
+            telemetry=telemetry,
+        )
+        return result
 
-        logger.info(f"所有收集器运行完成，共收集 {total_items} 条数据")
+    def get_daily_limited_api(self, collector: BaseCollector) -> Optional[str]:
+        """受每日调用次数限制的收集器返回对应的 API 名称，其它返回 None"""
+        if isinstance(collector, AINewsCollector):
+            return APICallRecord.API_AI_NEWS_COLLECT
+        return None
 
-        return {"success": True, "total_items": total_items, "results": results}
+    def get_collector_timeout(self, collector: BaseCollector) -> float:
+        """获取收集器的运行截止时间（秒）"""
+        return collector.timeout or settings.collector_timeout
 
     async def save_items(self, items: List[CollectorItem], collector: BaseCollector):
         """保存收集到的数据到数据库"""
         if not items:
+            # 没有数据（如页面未变化）时只记录抓取状态
+            if getattr(collector, "pending_fetch_state", None):
+                with get_db_context() as db:
+                    collector.save_fetch_state(db)
+                    db.commit()
             return
 
         logger.info(f"开始保存 {len(items)} 条数据到数据库")
@@ -120,29 +254,41 @@ class CollectorManager:
         with get_db_context() as db:
             saved_count = 0
 
-            for item in items:
-                try:
-                    # TODO #3 数据收集器: 优化数据去重逻辑
-                    if await self.is_duplicate(db, item):
+            # 批量去重：每张表一次 IN 查询，然后在内存中过滤
+            new_items = await self.filter_duplicates(db, items)
+            logger.info(f"去重后剩余 {len(new_items)}/{len(items)} 条新数据")
+
+            # 新闻和 Cursor 更新走批量 upsert，每个块一次写入往返
+            if self.is_news_collector(collector):
+                result = await self.save_news_articles(db, new_items)
+                saved_count = result.inserted_count + result.updated_count
+            elif self.is_cursor_collector(collector):
+                result = await self.save_cursor_updates(db, new_items)
+                saved_count = result.inserted_count + result.updated_count
+                # 抓取状态与数据同一事务提交；有版本写入失败时不记录，下次重新处理
+                if not result.failed:
+                    collector.save_fetch_state(db)
+            else:
+                for item in new_items:
+                    try:
+                        # 根据收集器类型保存到不同的表
+                        if self.is_project_collector(collector):
+                            await self.save_project_release(db, item)
+                        elif self.is_tool_collector(collector):
+                            await self.save_tool_update(db, item)
+
+                        saved_count += 1
+
+                    except Exception as e:
+                        logger.error(f"保存数据失败: {e}")
                         continue
 
-                    # 根据收集器类型保存到不同的表
-                    if self.is_news_collector(collector):
-                        await self.save_news_article(db, item)
-                    elif self.is_project_collector(collector):
-                        await self.save_project_release(db, item)
-                    elif self.is_tool_collector(collector):
-                        await self.save_tool_update(db, item)
-                    elif self.is_cursor_collector(collector):
-                        await self.save_cursor_update(db, item)
-
-                    saved_count += 1
-
-                except Exception as e:
-                    logger.error(f"保存数据失败: {e}")
-                    continue
-
             db.commit()
+            # 列表总数和接口响应缓存失效
+            count_cache.invalidate()
+            await response_cache.invalidate(
+                NEWS_NAMESPACE, CURSOR_NAMESPACE, DASHBOARD_NAMESPACE
+            )
             logger.info(f"成功保存 {saved_count} 条数据到数据库")
 
     def is_news_collector(self, collector: BaseCollector) -> bool:
@@ -165,51 +311,147 @@ class CollectorManager:
 
     async def is_duplicate(self, db, item: CollectorItem) -> bool:
         """检查数据是否已存在"""
-        # 检查新闻表
-        existing_news = (
-            db.query(NewsArticle).filter(NewsArticle.url == item.url).first()
-        )
-        if existing_news:
-            return True
+        return not await self.filter_duplicates(db, [item])
+
+    async def filter_duplicates(
+        self, db, items: List[CollectorItem]
+    ) -> List[CollectorItem]:
+        """批量过滤已存在的数据，同一批次内重复的 URL/版本只保留第一条"""
+        urls = {item.url for item in items}
+        versions = {
+            item.extra_data["version"]
+            for item in items
+            if item.extra_data and "version" in item.extra_data
+        }
+
+        existing_urls = set()
+        existing_versions = set()
+
+        # 检查新闻表、项目发布表、工具更新表
+        for column in (NewsArticle.url, ProjectRelease.repo_url, ToolUpdate.url):
+            existing_urls.update(self._select_existing(db, column, urls))
 
-        # 检查项目发布表
-        existing_project = (
-            db.query(ProjectRelease).filter(ProjectRelease.repo_url == item.url).first()
+        # 检查 Cursor 更新表
+        existing_versions.update(
+            self._select_existing(db, CursorUpdate.version, versions)
         )
-        if existing_project:
-            return True
 
-        # 检查工具更新表
-        existing_tool = db.query(ToolUpdate).filter(ToolUpdate.url == item.url).first()
-        if existing_tool:
-            return True
+        new_items = []
+        for item in items:
+            version = (item.extra_data or {}).get("version")
+            if item.url in existing_urls or (
+                version is not None and version in existing_versions
+            ):
+                continue
+
+            new_items.append(item)
+
+            # 批次内去重（空 URL 不参与，AI 新闻等数据没有链接）
+            if item.url:
+                existing_urls.add(item.url)
+            if version:
+                existing_versions.add(version)
+
+        return new_items
+
+    def _select_existing(self, db, column, values) -> set:
+        """查询 column 中已存在的值，按块发送 IN 查询"""
+        values = list(values)
+        found = set()
+        for start in range(0, len(values), self.DEDUPE_CHUNK_SIZE):
+            chunk = values[start : start + self.DEDUPE_CHUNK_SIZE]
+            rows = db.query(column).filter(column.in_(chunk)).all()
+            found.update(row[0] for row in rows)
+        return found
+
+    async def save_news_articles(
+        self, db, items: List[CollectorItem]
+    ) -> UpsertResult:
+        """
+        批量保存新闻文章（按 url 唯一键 upsert），并累加新增文章的统计计数
+
+        没有链接的新闻（如 AI 新闻）无法按 url 去重，先按 (标题, 来源) 过滤掉
+        批次内重复和数据库中已存在的文章
+        """
+        items = self._filter_existing_unlinked_news(db, items)
+        category_id = await self.get_category_id(db, "技术新闻")
+        now = datetime.utcnow()
+
+        rows = [
+            {
+                "title": item.title,
+                "summary": item.summary,
+                "content": item.content,
+                # 空链接存为 NULL，避免多条无链接新闻触发唯一键冲突
+                "url": item.url or None,
+                "source": item.source,
+                "author": item.author,
+                "published_at": item.published_at or now,
+                "tags": item.tags or [],
+                "model": item.model,
+                "category_id": category_id,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for item in items
+        ]
+
+        result = bulk_upsert(
+            db,
+            NewsArticle,
+            "url",
+            rows,
+            [
+                "title",
+                "summary",
+                "content",
+                "source",
+                "author",
+                "tags",
+                "model",
+                "updated_at",
+            ],
+        )
 
-        # 检查 Cursor 更新表
-        if item.extra_data and "version" in item.extra_data:
-            existing_cursor = (
-                db.query(CursorUpdate)
-                .filter(CursorUpdate.version == item.extra_data["version"])
-                .first()
+        # 只累加新增文章的统计计数（无链接的文章总是新增，同一链接只计一次）
+        inserted = set(result.inserted)
+        failed = {id(row) for row in result.failed}
+        new_rows = {}
+        for index, row in enumerate(rows):
+            if id(row) in failed:
+                continue
+            if row["url"] is None:
+                new_rows[index] = row
+            elif row["url"] in inserted:
+                new_rows[row["url"]] = row
+        record_news(db, new_rows.values())
+
+        return result
+
+    def _filter_existing_unlinked_news(
+        self, db, items: List[CollectorItem]
+    ) -> List[CollectorItem]:
+        """无链接的新闻按 (标题, 来源) 去重，批次内重复的只保留第一条"""
+        titles = list({item.title for item in items if not item.url})
+        existing = set()
+        for start in range(0, len(titles), self.DEDUPE_CHUNK_SIZE):
+            chunk = titles[start : start + self.DEDUPE_CHUNK_SIZE]
+            rows = (
+                db.query(NewsArticle.title, NewsArticle.source)
+                .filter(NewsArticle.title.in_(chunk))
+                .all()
             )
-            if existing_cursor:
-                return True
-
-        return False
+            existing.update((title, source) for title, source in rows)
 
-    async def save_news_article(self, db, item: CollectorItem):
-        """保存新闻文章"""
-        article = NewsArticle(
-            title=item.title,
-            summary=item.summary,
-            content=item.content,
-            url=item.url,
-            source=item.source,
-            author=item.author,
-            published_at=item.published_at or datetime.utcnow(),
-            tags=item.tags or [],
-            category_id=await self.get_category_id(db, "技术新闻"),
-        )
-        db.add(article)
+        kept = []
+        for item in items:
+            if not item.url:
+                key = (item.title, item.source)
+                if key in existing:
+                    continue
+                existing.add(key)
+            kept.append(item)
+        return kept
 
     async def save_project_release(self, db, item: CollectorItem):
         """保存项目发布"""
@@ -247,54 +489,15 @@ class CollectorManager:
         )
         db.add(update)
 
-    async def save_cursor_update(self, db, item: CollectorItem):
-        """保存 Cursor 更新"""
-        extra_data = item.extra_data or {}
-
-        # 检查是否已存在该版本
-        existing = (
-            db.query(CursorUpdate)
-            .filter(CursorUpdate.version == extra_data.get("version", ""))
-            .first()
-        )
-
-        if existing:
-            # 更新现有记录
-            existing.title = item.title
-            existing.original_content = extra_data.get("original_content", "")
-            existing.translated_content = extra_data.get("translated_content", "")
-            existing.analysis = extra_data.get("analysis", "")
-            existing.url = item.url
-            existing.collected_at = datetime.utcnow()
-            existing.updated_at = datetime.utcnow()
-        else:
-            # 创建新记录
-            cursor_update = CursorUpdate(
-                version=extra_data.get("version", ""),
-                release_date=item.published_at or datetime.utcnow(),
-                title=item.title,
-                original_content=extra_data.get("original_content", ""),
-                translated_content=extra_data.get("translated_content", ""),
-                analysis=extra_data.get("analysis", ""),
-                url=item.url,
-                collected_at=datetime.utcnow(),
-                is_major=extra_data.get("is_major", False),
-            )
-            db.add(cursor_update)
+    async def save_cursor_updates(
+        self, db, items: List[CollectorItem]
+    ) -> UpsertResult:
+        """批量保存 Cursor 更新（按 version 唯一键 upsert）"""
+        return bulk_upsert_cursor_updates(db, items)
 
     async def get_category_id(self, db, category_name: str) -> Optional[int]:
-        """获取或创建分类ID"""
-        category = db.query(Category).filter(Category.name == category_name).first()
-
-        if not category:
-            # TODO #3 数据收集器: 预设分类数据初始化
-            category = Category(
-                name=category_name, description=f"自动创建的{category_name}分类"
-            )
-            db.add(category)
-            db.flush()
-
-        return category.id
+        """获取或创建分类ID（走进程内缓存）"""
+        return category_cache.get_id(db, category_name)
 
 
 # 全局收集器管理器实例
@@ -0,0 +1,70 @@
+"""
+HTML 解析进程池
+HTML 解析是 CPU 密集型操作，放到子进程中执行，避免阻塞事件循环
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _warm_worker() -> bool:
+    """子进程预热：提前导入解析依赖"""
+    import lxml.html  # noqa: F401
+    import collectors.changelog_parser  # noqa: F401
+
+    return True
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """获取解析进程池，PARSE_POOL_WORKERS 为 0 时返回 None（改用线程执行）"""
+    global _pool
+    if settings.parse_pool_workers <= 0:
+        return None
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.parse_pool_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def run_in_parse_pool(func: Callable, *args: Any) -> Any:
+    """在解析进程池中执行函数，参数和返回值必须可以 pickle"""
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+    if pool is None:
+        return await asyncio.to_thread(func, *args)
+    return await loop.run_in_executor(pool, func, *args)
+
+
+async def warm_parse_pool():
+    """启动所有子进程并预热（应用启动时调用）"""
+    pool = get_parse_pool()
+    if pool is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, _warm_worker)
+            for _ in range(settings.parse_pool_workers)
+        )
+    )
+    logger.info(f"解析进程池预热完成，共 {settings.parse_pool_workers} 个进程")
+
+
+def shutdown_parse_pool():
+    """关闭解析进程池（应用关闭时调用）"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,212 @@
+"""
+收集器运行遥测
+每次运行记录各阶段耗时（fetch / parse / llm / persist）、LLM 调用次数、缓存命中和错误，
+运行结束后写入 collector_logs。当前运行的遥测对象保存在 contextvar 中，
+LLM 客户端等底层代码无需传参即可记录；不在收集器运行中时记录操作为空操作
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from database import get_db_context
+from metrics import COLLECTOR_PHASE_DURATION, COLLECTOR_RUN_DURATION, COLLECTOR_RUNS
+from models import CollectorLog
+from rollups import (
+    METRIC_COLLECTOR_ITEMS,
+    METRIC_COLLECTOR_RUNS,
+    METRIC_COLLECTOR_SUCCESS,
+    increment,
+)
+
+logger = logging.getLogger(__name__)
+
+# 记录耗时的阶段（collector_logs 中各有一列）
+PHASES = ("fetch", "parse", "llm", "persist")
+
+# 每次运行最多保留的错误条数和单条错误长度
+MAX_ERRORS = 20
+MAX_ERROR_LENGTH = 500
+
+
+class RunTelemetry:
+    """
+    一次收集器运行的遥测数据
+
+    同一阶段多次进入时耗时累加；并发执行的 LLM 调用会叠加，
+    因此 llm 阶段耗时可能大于运行总耗时
+    """
+
+    def __init__(self):
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        self._end: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.api_calls = 0
+        self.cache_hits = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+
+    @property
+    def duration(self) -> float:
+        """运行总耗时（秒），未结束时为到目前为止的耗时"""
+        return (self._end or time.perf_counter()) - self._start
+
+    def finish(self):
+        """结束计时（再次调用会把之后的保存阶段也计入总耗时）"""
+        self._end = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record_api_call(self, count: int = 1):
+        self.api_calls += count
+
+    def record_cache_hit(self):
+        self.cache_hits += 1
+
+    def record_error(self, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(str(message)[:MAX_ERROR_LENGTH])
+
+    def phase_ms(self, name: str) -> int:
+        return int(self.phases.get(name, 0.0) * 1000)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "duration_ms": int(self.duration * 1000),
+            "phases_ms": {name: self.phase_ms(name) for name in self.phases},
+            "api_calls": self.api_calls,
+            "cache_hits": self.cache_hits,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+_current: ContextVar[Optional[RunTelemetry]] = ContextVar(
+    "collector_run_telemetry", default=None
+)
+
+
+def current() -> Optional[RunTelemetry]:
+    """当前运行的遥测对象"""
+    return _current.get()
+
+
+@contextmanager
+def track_run() -> Iterator[RunTelemetry]:
+    """
+    开始记录一次运行；运行中创建的子任务共享同一个遥测对象
+
+    已在记录中时（如管理器包裹了收集器自身的 run）直接复用外层对象
+    """
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+
+    telemetry = RunTelemetry()
+    token = _current.set(telemetry)
+    try:
+        yield telemetry
+    finally:
+        telemetry.finish()
+        _current.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """记录当前运行某个阶段的耗时"""
+    telemetry = _current.get()
+    if telemetry is None:
+        yield
+    else:
+        with telemetry.phase(name):
+            yield
+
+
+def record_api_call(count: int = 1):
+    telemetry = _current.get()
+    if telemetry is not None:
+        telemetry.record_api_call(count)
+
+
+def record_cache_hit():
+    telemetry = _current.get()
+    if telemetry is not None:
+        telemetry.record_cache_hit()
+
+
+def record_error(message: str):
+    telemetry = _current.get()
+    if telemetry is not None:
+        telemetry.record_error(message)
+
+
+def log_collector_run(
+    collector_name: str,
+    success: bool,
+    items_collected: int = 0,
+    execution_time: float = 0,
+    message: str = "",
+    telemetry: Optional[RunTelemetry] = None,
+):
+    """写入一条收集器运行记录（collector_logs），累加仪表盘的成功率计数并更新 /metrics"""
+    status = CollectorLog.STATUS_SUCCESS if success else CollectorLog.STATUS_FAILED
+    COLLECTOR_RUNS.inc(collector=collector_name, status=status)
+
+    if telemetry is not None:
+        # 保存阶段在收集器返回之后，重新结束计时把它计入总耗时
+        telemetry.finish()
+        execution_time = telemetry.duration
+        for name, seconds in telemetry.phases.items():
+            COLLECTOR_PHASE_DURATION.observe(
+                seconds, collector=collector_name, phase=name
+            )
+        fields: Dict[str, Any] = {
+            "started_at": telemetry.started_at,
+            "duration_ms": int(telemetry.duration * 1000),
+            **{f"{name}_ms": telemetry.phase_ms(name) for name in PHASES},
+            "api_calls": telemetry.api_calls,
+            "cache_hits": telemetry.cache_hits,
+            "error_count": telemetry.error_count,
+            "errors": telemetry.errors,
+        }
+    else:
+        fields: Dict[str, Any] = {"duration_ms": int((execution_time or 0) * 1000)}
+    COLLECTOR_RUN_DURATION.observe(execution_time or 0, collector=collector_name)
+
+    try:
+        with get_db_context() as db:
+            db.add(
+                CollectorLog(
+                    collector_name=collector_name,
+                    status=status,
+                    message=message,
+                    items_collected=items_collected,
+                    execution_time=int(execution_time or 0),
+                    **fields,
+                )
+            )
+            increment(
+                db,
+                {
+                    (METRIC_COLLECTOR_RUNS, collector_name): 1,
+                    (METRIC_COLLECTOR_SUCCESS, collector_name): 1 if success else 0,
+                    (METRIC_COLLECTOR_ITEMS, collector_name): items_collected,
+                },
+            )
+            db.commit()
+    except Exception as e:
+        # 运行记录写入失败不影响采集结果
+        logger.error(f"写入收集器运行记录失败: {collector_name}: {e}")
@@ -0,0 +1,203 @@
+"""
+批量 Upsert 写入器
+MySQL 使用 INSERT ... ON DUPLICATE KEY UPDATE，SQLite 使用 ON CONFLICT DO UPDATE（测试用），
+其它数据库退化为一次批量 INSERT 加一次批量 UPDATE。
+每块在保存点中写入，整块失败时逐行重试，坏数据只跳过自身
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import CursorUpdate
+from rollups import record_cursor_releases
+
+logger = logging.getLogger(__name__)
+
+# 每个块包含的最大行数（一个块对应一次写入往返）
+UPSERT_CHUNK_SIZE = 500
+
+
+@dataclass
+class UpsertResult:
+    """Upsert 结果：新增和更新的唯一键列表，以及写入失败被跳过的行"""
+
+    inserted: List[Any] = field(default_factory=list)
+    updated: List[Any] = field(default_factory=list)
+    failed: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def inserted_count(self) -> int:
+        return len(self.inserted)
+
+    @property
+    def updated_count(self) -> int:
+        return len(self.updated)
+
+
+def bulk_upsert(
+    db,
+    model,
+    key: str,
+    rows: List[Dict[str, Any]],
+    update_columns: List[str],
+) -> UpsertResult:
+    """
+    按唯一键批量写入数据
+
+    Args:
+        db: 数据库会话
+        model: ORM 模型类
+        key: 唯一键字段名（如 version、url），值为 None 的行总是新增
+        rows: 待写入的行，所有行的字段必须一致
+        update_columns: 键冲突时需要更新的字段
+    """
+    result = UpsertResult()
+    if not rows:
+        return result
+
+    # 同一批次内相同键只保留最后一条
+    keyed_rows: Dict[Any, Dict[str, Any]] = {}
+    unkeyed_rows = []
+    for row in rows:
+        if row.get(key) is None:
+            unkeyed_rows.append(row)
+        else:
+            keyed_rows[row[key]] = row
+    rows = list(keyed_rows.values()) + unkeyed_rows
+
+    key_column = getattr(model.__table__.c, key)
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start : start + UPSERT_CHUNK_SIZE]
+        keys = [row[key] for row in chunk if row.get(key) is not None]
+
+        # 一次 IN 查询区分新增和更新，用于统计
+        existing = set()
+        if keys:
+            existing = {
+                value
+                for (value,) in db.query(key_column).filter(key_column.in_(keys)).all()
+            }
+
+        # 整块写入失败时（如某行字段超长）逐行重试，只跳过出错的行
+        try:
+            with db.begin_nested():
+                _write_chunk(db, model, key, chunk, update_columns, existing)
+            written = chunk
+        except SQLAlchemyError as e:
+            logger.warning(f"{model.__tablename__} 批量写入失败，改为逐行写入: {e}")
+            written = []
+            for row in chunk:
+                try:
+                    with db.begin_nested():
+                        _write_chunk(db, model, key, [row], update_columns, existing)
+                    written.append(row)
+                except SQLAlchemyError as row_error:
+                    logger.error(
+                        f"{model.__tablename__} 写入失败，跳过 {key}={row.get(key)}: "
+                        f"{row_error}"
+                    )
+                    result.failed.append(row)
+
+        for row in written:
+            if row.get(key) in existing:
+                result.updated.append(row[key])
+            else:
+                result.inserted.append(row.get(key))
+
+    return result
+
+
+def _write_chunk(
+    db,
+    model,
+    key: str,
+    chunk: List[Dict[str, Any]],
+    update_columns: List[str],
+    existing: Set[Any],
+):
+    """一次写入往返：MySQL / SQLite 一条 upsert 语句，其它数据库批量 INSERT + UPDATE"""
+    key_column = getattr(model.__table__.c, key)
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql_insert(model.__table__).values(chunk)
+        stmt = stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+        db.execute(stmt)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(model.__table__).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key],
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+        db.execute(stmt)
+    else:
+        new_rows = [row for row in chunk if row.get(key) not in existing]
+        old_rows = [
+            {"_key": row[key], **{f"_{c}": row[c] for c in update_columns}}
+            for row in chunk
+            if row.get(key) in existing
+        ]
+        if new_rows:
+            db.execute(insert(model.__table__), new_rows)
+        if old_rows:
+            db.execute(
+                update(model.__table__)
+                .where(key_column == bindparam("_key"))
+                .values({c: bindparam(f"_{c}") for c in update_columns}),
+                old_rows,
+            )
+
+
+# Cursor 更新在键冲突时刷新的字段（发布日期和是否重大更新保持首次写入的值）
+CURSOR_UPDATE_COLUMNS = [
+    "title",
+    "translated_title",
+    "original_content",
+    "translated_content",
+    "analysis",
+    "url",
+    "collected_at",
+    "updated_at",
+]
+
+
+def bulk_upsert_cursor_updates(db, items) -> UpsertResult:
+    """把 Cursor 采集结果批量 upsert 到 cursor_updates 表，并累加新增版本的统计计数"""
+    now = datetime.utcnow()
+    rows = [
+        {
+            "version": item.extra_data.get("version", ""),
+            "release_date": item.published_at or now,
+            "title": item.title,
+            "translated_title": item.extra_data.get("translated_title", ""),
+            "original_content": item.extra_data.get("original_content", ""),
+            "translated_content": item.extra_data.get("translated_content", ""),
+            "analysis": item.extra_data.get("analysis", ""),
+            "url": item.url,
+            "collected_at": now,
+            "is_major": item.extra_data.get("is_major", False),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for item in items
+    ]
+
+    result = bulk_upsert(db, CursorUpdate, "version", rows, CURSOR_UPDATE_COLUMNS)
+
+    # 同一批次内相同版本只计一次
+    inserted = set(result.inserted)
+    release_dates = {
+        row["version"]: row["release_date"] for row in rows if row["version"] in inserted
+    }
+    record_cursor_releases(db, release_dates.values())
+    return result
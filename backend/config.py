@@ -34,5 +34,76 @@ class Settings:
             "AI_MODEL", "grok-3-deepsearch"
         )  # 使用grok-3-deepsearch模型
 
+        # LLM 客户端配置（所有收集器共享一个连接池）
+        self.llm_timeout = float(os.getenv("LLM_TIMEOUT", "120"))
+        self.llm_max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+        # 默认不读取 HTTP(S)_PROXY 环境变量，容器内直连
+        self.llm_trust_env = os.getenv("LLM_TRUST_ENV", "false").lower() == "true"
+        # 流式（SSE）接收 LLM 响应，并通过 WebSocket 转发增量内容
+        self.llm_stream = os.getenv("LLM_STREAM", "false").lower() == "true"
+
+        # Cursor 采集器同时处理的新版本数（并发 LLM 调用上限）
+        self.cursor_llm_concurrency = int(os.getenv("CURSOR_LLM_CONCURRENCY", "4"))
+
+        # 收集器并发运行配置
+        self.collector_concurrency = int(os.getenv("COLLECTOR_CONCURRENCY", "2"))
+        self.collector_timeout = float(os.getenv("COLLECTOR_TIMEOUT", "900"))
+
+        # 后台任务队列：工作协程数量和保留的任务记录数
+        self.job_workers = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_history_size = int(os.getenv("JOB_HISTORY_SIZE", "200"))
+
+        # 定时采集配置
+        # COLLECTOR_SCHEDULES 为 JSON：{"收集器名称": "interval:秒数" 或 "cron:分 时 日 月 周"}
+        self.scheduler_enabled = (
+            os.getenv("SCHEDULER_ENABLED", "false").lower() == "true"
+        )
+        self.collector_schedules = os.getenv(
+            "COLLECTOR_SCHEDULES", '{"cursor_collector": "interval:21600"}'
+        )
+        self.scheduler_jitter = int(os.getenv("SCHEDULER_JITTER", "60"))
+        # 多副本租约后端：db / redis
+        self.scheduler_lease_backend = os.getenv(
+            "SCHEDULER_LEASE_BACKEND", "db"
+        ).lower()
+
+        # 接口响应缓存配置（backend: memory / redis / none）
+        self.response_cache_backend = os.getenv(
+            "RESPONSE_CACHE_BACKEND", "memory"
+        ).lower()
+        self.response_cache_max_entries = int(
+            os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000")
+        )
+
+        # HTML 解析进程池大小（0 表示在线程中解析）
+        self.parse_pool_workers = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+
+        # LLM 响应缓存配置（backend: disk / redis / none）
+        self.llm_cache_backend = os.getenv("LLM_CACHE_BACKEND", "disk").lower()
+        self.llm_cache_dir = os.getenv("LLM_CACHE_DIR", "./cache/llm")
+        self.llm_cache_ttl = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+        self.llm_cache_max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+        # WebSocket 单次发送超时（秒），超时的连接会被断开
+        self.websocket_send_timeout = float(os.getenv("WEBSOCKET_SEND_TIMEOUT", "5"))
+        # 每个连接的发送队列长度，以及队列满时的处理策略
+        # （drop_oldest 丢弃最旧消息 / coalesce 合并进度消息 / disconnect 断开连接）
+        self.websocket_queue_size = int(os.getenv("WEBSOCKET_QUEUE_SIZE", "100"))
+        self.websocket_overflow_policy = os.getenv(
+            "WEBSOCKET_OVERFLOW_POLICY", "coalesce"
+        ).lower()
+        # 进度事件每个房间每秒最多发送的帧数（0 表示不合并，逐条发送）
+        self.websocket_room_max_fps = float(os.getenv("WEBSOCKET_ROOM_MAX_FPS", "5"))
+        # 多副本时转发 WebSocket 房间广播（none / memory / redis）
+        self.websocket_bridge = os.getenv("WEBSOCKET_BRIDGE", "none").lower()
+        # 等待转发给其它副本的广播队列长度和单次发布超时（秒），
+        # 队列满或发布超时的广播直接丢弃，不阻塞本进程的广播
+        self.websocket_bridge_queue_size = int(
+            os.getenv("WEBSOCKET_BRIDGE_QUEUE_SIZE", "1000")
+        )
+        self.websocket_bridge_publish_timeout = float(
+            os.getenv("WEBSOCKET_BRIDGE_PUBLISH_TIMEOUT", "2")
+        )
+
 
 settings = Settings()
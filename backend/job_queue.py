@@ -0,0 +1,162 @@
+"""
+后台任务队列
+采集接口只负责提交任务并立即返回任务ID，由工作协程在后台执行，
+客户端通过 /api/v1/jobs/{job_id} 轮询状态，或订阅 WebSocket 房间 job_{job_id} 获取实时进度
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """后台任务"""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    id: str
+    type: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    status: str = STATUS_QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "params": self.params,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_time": (self.started_at or time.time()) - self.created_at,
+            "run_time": (
+                (self.finished_at or time.time()) - self.started_at
+                if self.started_at
+                else 0
+            ),
+        }
+
+
+JobHandler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """进程内任务队列：固定数量的工作协程按提交顺序执行任务"""
+
+    def __init__(self, workers: int, history_size: int):
+        self.workers = workers
+        self.history_size = history_size
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def register(self, job_type: str, handler: JobHandler):
+        """注册任务处理函数，处理函数返回的字典作为任务结果"""
+        self._handlers[job_type] = handler
+
+    async def start(self):
+        """启动工作协程（应用启动时调用）"""
+        if self._worker_tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"后台任务队列已启动，共 {self.workers} 个工作协程")
+
+    async def stop(self):
+        """停止工作协程（应用关闭时调用），正在执行的任务会被取消"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+
+    def enqueue(self, job_type: str, **params: Any) -> Job:
+        """提交任务，立即返回"""
+        if job_type not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {job_type}")
+        if self._queue is None:
+            raise RuntimeError("后台任务队列未启动")
+
+        job = Job(id=uuid.uuid4().hex, type=job_type, params=params)
+        self._jobs[job.id] = job
+        self._trim_history()
+        self._queue.put_nowait(job)
+        logger.info(f"任务已提交: {job_type} ({job.id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self, job_type: Optional[str] = None, limit: int = 20) -> List[Job]:
+        """最近提交的任务，新的在前"""
+        jobs = [
+            job
+            for job in reversed(self._jobs.values())
+            if job_type is None or job.type == job_type
+        ]
+        return jobs[:limit]
+
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _trim_history(self):
+        """只保留最近的任务记录，优先丢弃最早完成的任务"""
+        overflow = len(self._jobs) - self.history_size
+        if overflow <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:overflow]:
+            del self._jobs[job_id]
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            job.status = Job.STATUS_RUNNING
+            job.started_at = time.time()
+            logger.info(f"工作协程 {index} 开始执行任务: {job.type} ({job.id})")
+
+            try:
+                job.result = await self._handlers[job.type](job)
+                job.status = Job.STATUS_SUCCEEDED
+            except asyncio.CancelledError:
+                job.status = Job.STATUS_FAILED
+                job.error = "任务已取消"
+                raise
+            except Exception as e:
+                logger.error(f"任务执行失败: {job.type} ({job.id}): {e}")
+                job.status = Job.STATUS_FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+
+# 全局任务队列实例
+job_queue = JobQueue(
+    workers=settings.job_workers, history_size=settings.job_history_size
+)
@@ -1,14 +1,23 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 from contextlib import asynccontextmanager
 import uuid
-import asyncio
+import time
 
 from database import create_tables, engine
-from routes import news, tools, projects, dashboard, collectors, cursor
-from websocket_manager import websocket_manager
+from category_cache import category_cache
+from rollups import backfill_if_needed
+from routes import news, tools, projects, dashboard, collectors, cursor, jobs
+from websocket_manager import room_batcher, websocket_manager
+from websocket_bridge import websocket_bridge
+from collectors.llm_client import llm_client
+from collectors.parse_pool import warm_parse_pool, shutdown_parse_pool
+from job_queue import job_queue
+from scheduler import collector_scheduler
+from config import settings
+import metrics
 
 
 # 应用生命周期管理
@@ -16,8 +25,28 @@ from websocket_manager import websocket_manager
 async def lifespan(app: FastAPI):
     # 启动时创建数据库表
     create_tables()
+    # 写入预设分类并预热分类缓存
+    category_cache.initialize()
+    # 首次启用统计计数表时从原始表回填
+    backfill_if_needed()
+    # 预热 HTML 解析进程池
+    await warm_parse_pool()
+    # 启动 WebSocket 跨副本广播
+    await websocket_bridge.start()
+    # 启动后台任务工作协程
+    await job_queue.start()
+    # 启动定时采集
+    if settings.scheduler_enabled:
+        collector_scheduler.start()
     yield
     # 关闭时清理资源
+    collector_scheduler.shutdown()
+    await job_queue.stop()
+    # 发出后台任务最后的进度事件
+    await room_batcher.flush_all()
+    await websocket_bridge.stop()
+    await llm_client.aclose()
+    shutdown_parse_pool()
     engine.dispose()
 
 
@@ -39,6 +68,64 @@ app.add_middleware(
 )
 
 
+# 请求指标：按路由模板统计，避免路径参数导致标签过多
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start_time = time.perf_counter()
+    status = 500
+    metrics.HTTP_REQUESTS_IN_PROGRESS.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_REQUESTS_IN_PROGRESS.dec()
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        metrics.HTTP_REQUESTS.inc(
+            method=request.method, route=route_path, status=str(status)
+        )
+        metrics.HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start_time, method=request.method, route=route_path
+        )
+
+
+# 输出时读取的指标
+metrics.DB_POOL_SIZE.set_function(lambda: getattr(engine.pool, "size", lambda: 0)())
+metrics.DB_POOL_MAX_CONNECTIONS.set_function(
+    lambda: getattr(engine.pool, "size", lambda: 0)()
+    + max(getattr(engine.pool, "_max_overflow", 0), 0)
+)
+metrics.DB_POOL_CHECKED_OUT.set_function(
+    lambda: getattr(engine.pool, "checkedout", lambda: 0)()
+)
+metrics.DB_POOL_OVERFLOW.set_function(
+    lambda: max(getattr(engine.pool, "overflow", lambda: 0)(), 0)
+)
+metrics.WEBSOCKET_CONNECTIONS.set_function(
+    lambda: websocket_manager.get_total_connections()
+)
+metrics.WEBSOCKET_ROOM_CONNECTIONS.set_function(
+    lambda: {
+        (room,): len(connections)
+        for room, connections in websocket_manager.rooms.items()
+    }
+)
+metrics.WEBSOCKET_QUEUE_DEPTH.set_function(
+    lambda: sum(websocket_manager.get_queue_depths())
+)
+metrics.WEBSOCKET_QUEUE_MAX_DEPTH.set_function(
+    lambda: max(websocket_manager.get_queue_depths(), default=0)
+)
+metrics.JOB_QUEUE_PENDING.set_function(job_queue.pending_count)
+
+
+# Prometheus 指标
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # 健康检查
 @app.get("/health")
 async def health_check():
@@ -55,21 +142,9 @@ async def websocket_endpoint(websocket: WebSocket, room: str):
         try:
             # 保持连接活跃
             while True:
-                # 等待客户端消息
+                # 等待客户端消息：订阅/退订房间，或心跳
                 data = await websocket.receive_text()
-
-                # 处理客户端消息（如果需要）
-                # 这里可以添加消息处理逻辑
-
-                # 发送心跳响应
-                await websocket_manager.send_personal_message(
-                    connection_id,
-                    {
-                        "type": "heartbeat",
-                        "message": "pong",
-                        "timestamp": asyncio.get_event_loop().time(),
-                    },
-                )
+                await websocket_manager.handle_client_message(connection_id, data)
 
         except WebSocketDisconnect:
             websocket_manager.disconnect(connection_id)
@@ -100,6 +175,7 @@ app.include_router(projects.router, prefix="/api/v1/projects", tags=["开源项
 app.include_router(dashboard.router, prefix="/api/v1/dashboard", tags=["仪表盘"])
 app.include_router(collectors.router, prefix="/api/v1/collectors", tags=["数据收集器"])
 app.include_router(cursor.router, prefix="/api/v1", tags=["Cursor更新"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["后台任务"])
 
 
 # 根路径
@@ -0,0 +1,334 @@
+"""
+Prometheus 指标
+进程内的轻量指标注册表（计数器、仪表、直方图），/metrics 以 Prometheus 文本格式输出。
+业务代码只需 inc / observe，或者用 histogram.time() 给代码块计时
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 输出格式的 Content-Type（响应会自动补上 charset=utf-8）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """指标基类：按标签值分组保存样本"""
+
+    TYPE = ""
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, LabelValues, float, Tuple[str, ...]]]:
+        """返回 (样本名后缀, 标签值, 数值, 额外标签名) 列表"""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        for suffix, values, value, extra_names in self.samples():
+            labels = _format_labels(self.labelnames + extra_names, values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+
+    TYPE = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [("", key, v, ()) for key, v in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    """可增可减的数值；设置了 set_function 时在输出时读取当前值"""
+
+    TYPE = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], object]] = None
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], object]):
+        """
+        输出时调用 function 获取当前值
+
+        无标签时返回数值；有标签时返回 {标签值元组: 数值}
+        """
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            value = self._function()
+            if isinstance(value, dict):
+                return [("", tuple(map(str, k)), v, ()) for k, v in value.items()]
+            return [("", (), float(value), ())]
+        with self._lock:
+            return [("", key, v, ()) for key, v in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """直方图：按分桶累计观测值，附带总和与次数"""
+
+    TYPE = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # {标签值: [各分桶计数..., 总和, 次数]}
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """给代码块计时（异常时同样记录）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+
+        samples = []
+        for key, state in items:
+            cumulative = 0.0
+            for index, bound in enumerate(self.buckets):
+                cumulative += state[index]
+                labels = key + (_format_value(bound),)
+                samples.append(("_bucket", labels, cumulative, ("le",)))
+            samples.append(("_sum", key, state[-2], ()))
+            samples.append(("_count", key, state[-1], ()))
+        return samples
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式输出全部指标；单个指标读取失败时跳过"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f"# {metric.name} 读取失败: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+registry = Registry()
+
+
+# HTTP 接口
+HTTP_REQUESTS = registry.counter(
+    "logwatcher_http_requests_total", "HTTP 请求数", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "logwatcher_http_request_duration_seconds", "HTTP 请求耗时", ("method", "route")
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge(
+    "logwatcher_http_requests_in_progress", "正在处理的 HTTP 请求数"
+)
+
+# 数据库连接池（输出时从 engine.pool 读取）
+DB_POOL_SIZE = registry.gauge("logwatcher_db_pool_size", "连接池常驻连接数")
+DB_POOL_MAX_CONNECTIONS = registry.gauge(
+    "logwatcher_db_pool_max_connections", "连接池最大连接数（常驻 + 溢出）"
+)
+DB_POOL_CHECKED_OUT = registry.gauge("logwatcher_db_pool_checked_out", "已借出的连接数")
+DB_POOL_OVERFLOW = registry.gauge("logwatcher_db_pool_overflow", "当前溢出连接数")
+
+# LLM 调用
+LLM_REQUESTS = registry.counter(
+    "logwatcher_llm_requests_total",
+    "LLM 请求次数（每次重试单独计数）",
+    ("kind", "outcome"),
+)
+LLM_REQUEST_DURATION = registry.histogram(
+    "logwatcher_llm_request_duration_seconds",
+    "LLM 单次请求耗时",
+    ("kind", "outcome"),
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600),
+)
+LLM_CACHE_LOOKUPS = registry.counter(
+    "logwatcher_llm_cache_lookups_total", "LLM 响应缓存查询次数", ("result",)
+)
+
+# 收集器
+COLLECTOR_RUNS = registry.counter(
+    "logwatcher_collector_runs_total", "收集器运行次数", ("collector", "status")
+)
+COLLECTOR_RUN_DURATION = registry.histogram(
+    "logwatcher_collector_run_duration_seconds",
+    "收集器单次运行总耗时",
+    ("collector",),
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800),
+)
+COLLECTOR_PHASE_DURATION = registry.histogram(
+    "logwatcher_collector_phase_duration_seconds",
+    "收集器单次运行中各阶段的累计耗时",
+    ("collector", "phase"),
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+# WebSocket 和后台任务（输出时读取当前值）
+WEBSOCKET_CONNECTIONS = registry.gauge(
+    "logwatcher_websocket_connections", "当前 WebSocket 连接数"
+)
+WEBSOCKET_ROOM_CONNECTIONS = registry.gauge(
+    "logwatcher_websocket_room_connections", "各房间的 WebSocket 连接数", ("room",)
+)
+WEBSOCKET_MESSAGES_SENT = registry.counter(
+    "logwatcher_websocket_messages_sent_total", "成功发送的 WebSocket 消息数"
+)
+WEBSOCKET_SEND_FAILURES = registry.counter(
+    "logwatcher_websocket_send_failures_total",
+    "发送失败并被断开的 WebSocket 连接数",
+    ("reason",),
+)
+WEBSOCKET_BROADCAST_DURATION = registry.histogram(
+    "logwatcher_websocket_broadcast_duration_seconds", "一次广播写入所有连接发送队列的耗时"
+)
+WEBSOCKET_QUEUE_DEPTH = registry.gauge(
+    "logwatcher_websocket_queue_depth", "所有连接发送队列中待发送的消息总数"
+)
+WEBSOCKET_QUEUE_MAX_DEPTH = registry.gauge(
+    "logwatcher_websocket_queue_max_depth", "单个连接发送队列的最大积压消息数"
+)
+WEBSOCKET_QUEUE_DROPS = registry.counter(
+    "logwatcher_websocket_queue_drops_total",
+    "发送队列满时被丢弃或合并的消息数",
+    ("reason",),
+)
+WEBSOCKET_BRIDGE_MESSAGES = registry.counter(
+    "logwatcher_websocket_bridge_messages_total",
+    "跨副本转发的 WebSocket 广播数",
+    ("direction",),
+)
+JOB_QUEUE_PENDING = registry.gauge("logwatcher_job_queue_pending", "排队中的后台任务数")
@@ -6,7 +6,9 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
     JSON,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -57,6 +59,11 @@ class NewsArticle(Base):
     # 关系
     category = relationship("Category", back_populates="news_articles")
 
+    # keyset 分页按 (published_at, id) 排序
+    __table_args__ = (
+        Index("idx_news_articles_published_at_id", "published_at", "id"),
+    )
+
 
 class ToolUpdate(Base):
     """工具更新表"""
@@ -147,6 +154,58 @@ class CursorUpdate(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # keyset 分页按 (release_date, id) 排序
+    __table_args__ = (
+        Index("idx_cursor_updates_release_date_id", "release_date", "id"),
+    )
+
+
+class FetchState(Base):
+    """抓取状态表 - 保存条件请求所需的 ETag / Last-Modified 和内容哈希"""
+
+    __tablename__ = "fetch_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, comment="抓取目标名称")
+    url = Column(String(1000), comment="抓取地址")
+    etag = Column(String(255), comment="响应 ETag")
+    last_modified = Column(String(100), comment="响应 Last-Modified")
+    content_hash = Column(String(64), comment="响应内容 SHA-256")
+    checked_at = Column(DateTime, comment="最后检查时间")
+    changed_at = Column(DateTime, comment="最后变化时间")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SchedulerLease(Base):
+    """调度租约表 - 多副本部署时保证同一收集器同一时间只在一个副本上运行"""
+
+    __tablename__ = "scheduler_leases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, comment="租约名称")
+    owner = Column(String(200), comment="持有者标识")
+    expires_at = Column(DateTime, index=True, comment="过期时间")
+    acquired_at = Column(DateTime, comment="获取时间")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class StatCounter(Base):
+    """统计计数表 - 仪表盘按 (指标, 维度) 汇总的计数，数据写入时增量累加"""
+
+    __tablename__ = "stat_counters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    metric = Column(String(50), comment="指标名称")
+    dimension = Column(String(200), comment="维度值（来源、分类ID、日期等）")
+    value = Column(Integer, default=0, comment="计数")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("metric", "dimension", name="uq_stat_counters_metric_dimension"),
+    )
+
 
 class CollectorLog(Base):
     """收集器日志表"""
@@ -159,8 +218,23 @@ class CollectorLog(Base):
     message = Column(Text, comment="执行信息")
     items_collected = Column(Integer, default=0, comment="收集条目数")
     execution_time = Column(Integer, comment="执行时间(秒)")
+    started_at = Column(DateTime, comment="开始时间")
+    duration_ms = Column(Integer, comment="总耗时(毫秒)")
+    fetch_ms = Column(Integer, default=0, comment="抓取阶段耗时(毫秒)")
+    parse_ms = Column(Integer, default=0, comment="解析阶段耗时(毫秒)")
+    llm_ms = Column(Integer, default=0, comment="LLM 阶段累计耗时(毫秒)")
+    persist_ms = Column(Integer, default=0, comment="保存阶段耗时(毫秒)")
+    api_calls = Column(Integer, default=0, comment="LLM API 调用次数")
+    cache_hits = Column(Integer, default=0, comment="LLM 缓存命中次数")
+    error_count = Column(Integer, default=0, comment="错误数")
+    errors = Column(JSON, comment="错误信息列表")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # 运行历史按收集器筛选、按时间倒序
+    __table_args__ = (
+        Index("idx_collector_logs_name_created_at", "collector_name", "created_at"),
+    )
+
     # 状态常量
     STATUS_SUCCESS = "success"
     STATUS_FAILED = "failed"
@@ -0,0 +1,125 @@
+"""
+Keyset 分页
+按 (排序列, id) 降序翻页，下一页从上一页最后一行之后开始，不再使用 OFFSET；
+翻页位置编码为不透明的 cursor 字符串。总数走带过期时间的进程内缓存，可选返回
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+# 总数缓存过期时间（秒）
+COUNT_CACHE_TTL = 30
+
+
+class InvalidCursor(ValueError):
+    """cursor 无法解析"""
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """把 (排序值, id) 编码为不透明的 cursor"""
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    raw = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """解析 cursor，格式错误时抛出 InvalidCursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"无效的分页 cursor: {cursor}") from e
+
+
+def keyset_paginate(
+    query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    row_key: Optional[Callable[[Any], Tuple[Any, int]]] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (sort_column DESC, id_column DESC) 取一页数据
+
+    排序列为空的行排在最后（与 MySQL / SQLite 的降序规则一致）。
+    返回 (当前页数据, 下一页 cursor)，没有更多数据时 cursor 为 None。
+
+    Args:
+        query: 已经加好过滤条件的查询（ORM 对象或列投影都可以）
+        sort_column: 排序列，如 CursorUpdate.release_date
+        id_column: 主键列，用于排序值相同时确定顺序
+        limit: 每页条数
+        cursor: 上一页返回的 cursor
+        row_key: 从结果行取 (排序值, id)，默认按列名读取属性
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is None:
+            # 已经翻到排序列为空的部分
+            query = query.filter(sort_column.is_(None), id_column < last_id)
+        else:
+            query = query.filter(
+                or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, id_column < last_id),
+                    sort_column.is_(None),
+                )
+            )
+
+    rows = (
+        query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if row_key is None:
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                getattr(last, sort_column.key), getattr(last, id_column.key)
+            )
+        else:
+            next_cursor = encode_cursor(*row_key(rows[-1]))
+
+    return rows, next_cursor
+
+
+class CountCache:
+    """查询总数缓存：列表页不必每次都执行 COUNT(*)"""
+
+    def __init__(self, ttl: float = COUNT_CACHE_TTL):
+        self.ttl = ttl
+        self._counts: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, query) -> int:
+        """返回缓存的总数，过期后重新执行 query.count()"""
+        cached = self._counts.get(key)
+        if cached and time.time() - cached[0] < self.ttl:
+            return cached[1]
+
+        count = query.count()
+        with self._lock:
+            self._counts[key] = (time.time(), count)
+        return count
+
+    def invalidate(self, prefix: str = ""):
+        """数据写入后清除以 prefix 开头的缓存"""
+        with self._lock:
+            for key in [k for k in self._counts if k.startswith(prefix)]:
+                del self._counts[key]
+
+
+# 全局总数缓存实例
+count_cache = CountCache()
@@ -0,0 +1,267 @@
+"""
+接口响应缓存
+读多写少的列表和统计接口缓存序列化后的 JSON，按命名空间失效（收集器写入数据后调用 invalidate），
+响应带 ETag，浏览器重新验证时返回 304。默认进程内缓存，多副本部署时使用 Redis
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 命名空间：数据写入时按命名空间整体失效
+NEWS_NAMESPACE = "news"
+CURSOR_NAMESPACE = "cursor"
+DASHBOARD_NAMESPACE = "dashboard"
+
+
+class MemoryResponseCache:
+    """进程内缓存，超过容量时淘汰最久未使用的条目"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # 命名空间的失效次数，用于丢弃失效前计算出的结果
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def generation(self, namespace: str) -> str:
+        with self._lock:
+            return str(self._generations.get(namespace, 0))
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, str]]:
+        full_key = f"{namespace}:{key}"
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.time() >= expires_at:
+                del self._entries[full_key]
+                return None
+            self._entries.move_to_end(full_key)
+            return value
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Dict[str, str],
+        ttl: float,
+        generation: Optional[str] = None,
+    ):
+        full_key = f"{namespace}:{key}"
+        with self._lock:
+            if generation is not None and generation != str(
+                self._generations.get(namespace, 0)
+            ):
+                # 计算期间命名空间已失效，结果可能过时
+                return
+            self._entries[full_key] = (time.time() + ttl, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def invalidate(self, namespace: str):
+        prefix = f"{namespace}:"
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for full_key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[full_key]
+
+
+class RedisResponseCache:
+    """
+    Redis 缓存：键中带命名空间版本号，失效时只需 INCR 版本号，
+    旧版本的键等待 TTL 自然过期
+    """
+
+    PREFIX = "response_cache:"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2
+        )
+
+    async def _version(self, namespace: str) -> str:
+        return await self._redis.get(f"{self.PREFIX}version:{namespace}") or "0"
+
+    async def generation(self, namespace: str) -> str:
+        return await self._version(namespace)
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, str]]:
+        version = await self._version(namespace)
+        raw = await self._redis.get(f"{self.PREFIX}{namespace}:{version}:{key}")
+        return json.loads(raw) if raw else None
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Dict[str, str],
+        ttl: float,
+        generation: Optional[str] = None,
+    ):
+        # 写到计算开始时的版本下：期间失效过的话这个键不会再被读取
+        version = generation
+        if version is None:
+            version = await self._version(namespace)
+        await self._redis.set(
+            f"{self.PREFIX}{namespace}:{version}:{key}",
+            json.dumps(value, ensure_ascii=False),
+            ex=max(1, int(ttl)),
+        )
+
+    async def invalidate(self, namespace: str):
+        await self._redis.incr(f"{self.PREFIX}version:{namespace}")
+
+
+class ResponseCache:
+    """响应缓存入口；缓存后端出错时只记录日志，接口照常返回"""
+
+    def __init__(self):
+        self._backend = None
+        self._initialized = False
+
+    def _get_backend(self):
+        if self._initialized:
+            return self._backend
+        self._initialized = True
+
+        backend = settings.response_cache_backend
+        if backend == "redis":
+            try:
+                self._backend = RedisResponseCache(settings.redis_url)
+                logger.info("接口响应缓存使用 Redis")
+                return self._backend
+            except Exception as e:
+                logger.warning(f"Redis 不可用，接口响应缓存改用进程内缓存: {e}")
+
+        if backend != "none":
+            self._backend = MemoryResponseCache(settings.response_cache_max_entries)
+        return self._backend
+
+    async def get(self, namespace: str, key: str) -> Optional[Dict[str, str]]:
+        backend = self._get_backend()
+        if backend is None:
+            return None
+        try:
+            return await backend.get(namespace, key)
+        except Exception as e:
+            logger.warning(f"读取响应缓存失败: {e}")
+            return None
+
+    async def generation(self, namespace: str) -> Optional[str]:
+        """命名空间当前的失效代数，每次 invalidate 后变化；读取失败时返回 None"""
+        backend = self._get_backend()
+        if backend is None:
+            return None
+        try:
+            return await backend.generation(namespace)
+        except Exception as e:
+            logger.warning(f"读取响应缓存版本失败: {e}")
+            return None
+
+    async def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Dict[str, str],
+        ttl: float,
+        generation: Optional[str] = None,
+    ):
+        """
+        写入缓存；传入计算前读取的 generation 时，
+        命名空间在计算期间已失效则不写入（避免把失效前的结果缓存一个 TTL）
+        """
+        backend = self._get_backend()
+        if backend is None:
+            return
+        try:
+            await backend.set(namespace, key, value, ttl, generation)
+        except Exception as e:
+            logger.warning(f"写入响应缓存失败: {e}")
+
+    async def invalidate(self, *namespaces: str):
+        """数据写入后使命名空间下的所有缓存失效"""
+        backend = self._get_backend()
+        if backend is None:
+            return
+        for namespace in namespaces:
+            try:
+                await backend.invalidate(namespace)
+            except Exception as e:
+                logger.warning(f"清除响应缓存失败: {namespace}: {e}")
+
+
+# 全局响应缓存实例
+response_cache = ResponseCache()
+
+
+def _cache_key(request: Request) -> str:
+    """路径加排序后的查询参数"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def _json_response(entry: Dict[str, str], request: Request, cache_status: str):
+    headers = {
+        "ETag": entry["etag"],
+        # 浏览器可以缓存，但每次都要用 ETag 重新验证
+        "Cache-Control": "no-cache",
+        "X-Cache": cache_status,
+    }
+    if request.headers.get("if-none-match") == entry["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=entry["body"], media_type="application/json", headers=headers
+    )
+
+
+def cached_response(namespace: str, ttl: float):
+    """
+    缓存接口的 JSON 响应
+
+    被装饰的接口需要声明 request: Request 参数；接口抛出的异常不会被缓存
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any):
+            request: Request = kwargs["request"]
+            key = _cache_key(request)
+
+            entry = await response_cache.get(namespace, key)
+            if entry is not None:
+                return _json_response(entry, request, "HIT")
+
+            # 在计算前记下失效代数，计算期间数据被写入时不缓存本次结果
+            generation = await response_cache.generation(namespace)
+            result = await func(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+
+            body = json.dumps(jsonable_encoder(result), ensure_ascii=False)
+            entry = {
+                "body": body,
+                "etag": f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"',
+            }
+            await response_cache.set(namespace, key, entry, ttl, generation)
+            return _json_response(entry, request, "MISS")
+
+        return wrapper
+
+    return decorator
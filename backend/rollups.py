@@ -0,0 +1,220 @@
+"""
+仪表盘统计计数
+数据写入时在同一事务中累加 stat_counters 表（按来源、分类、日期等维度），
+仪表盘只读取计数表，不再扫描 news_articles / cursor_updates。
+计数表首次启用时从原始表回填一次
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from database import get_db_context
+from models import CollectorLog, CursorUpdate, NewsArticle, StatCounter
+
+logger = logging.getLogger(__name__)
+
+# 指标名称
+METRIC_NEWS_SOURCE = "news_source"  # 维度：新闻来源
+METRIC_NEWS_CATEGORY = "news_category"  # 维度：分类ID，未分类为空字符串
+METRIC_NEWS_DAY = "news_day"  # 维度：入库日期 YYYY-MM-DD
+METRIC_CURSOR_RELEASE_DAY = "cursor_release_day"  # 维度：Cursor 版本发布日期
+METRIC_COLLECTOR_RUNS = "collector_runs"  # 维度：收集器名称
+METRIC_COLLECTOR_SUCCESS = "collector_success"  # 维度：收集器名称
+METRIC_COLLECTOR_ITEMS = "collector_items"  # 维度：收集器名称
+
+# 回填标记：存在即表示计数表已从原始表回填过
+BACKFILL_MARKER = ("_meta", "backfilled")
+
+CounterKey = Tuple[str, str]
+
+
+def _day(value: Any) -> Optional[str]:
+    """日期时间转为 YYYY-MM-DD（数据库 DATE() 的返回值可能是字符串）"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def increment(db, deltas: Dict[CounterKey, int]):
+    """
+    按 (指标, 维度) 累加计数，与业务数据在同一事务中提交
+
+    MySQL / SQLite 一条 upsert 语句完成累加，其它数据库逐条查询后更新
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {"metric": metric, "dimension": dimension, "value": delta, "updated_at": now}
+        for (metric, dimension), delta in deltas.items()
+    ]
+    table = StatCounter.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            value=table.c.value + stmt.inserted.value,
+            updated_at=stmt.inserted.updated_at,
+        )
+        db.execute(stmt)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["metric", "dimension"],
+            set_={
+                "value": table.c.value + stmt.excluded.value,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.execute(stmt)
+    else:
+        for row in rows:
+            counter = (
+                db.query(StatCounter)
+                .filter(
+                    StatCounter.metric == row["metric"],
+                    StatCounter.dimension == row["dimension"],
+                )
+                .with_for_update()
+                .first()
+            )
+            if counter:
+                counter.value += row["value"]
+                counter.updated_at = now
+            else:
+                db.add(StatCounter(**row))
+
+
+def record_news(db, rows: Iterable[Dict[str, Any]]):
+    """
+    累加新增新闻的计数
+
+    Args:
+        rows: 新增的新闻行，需要 source、category_id、created_at 字段
+    """
+    deltas: Counter = Counter()
+    for row in rows:
+        deltas[(METRIC_NEWS_SOURCE, row.get("source") or "")] += 1
+        category_id = row.get("category_id")
+        deltas[(METRIC_NEWS_CATEGORY, "" if category_id is None else str(category_id))] += 1
+        deltas[(METRIC_NEWS_DAY, _day(row.get("created_at") or datetime.utcnow()))] += 1
+    increment(db, deltas)
+
+
+def record_cursor_releases(db, release_dates: Iterable[Optional[datetime]]):
+    """累加新增 Cursor 版本的发布日期计数"""
+    deltas: Counter = Counter(
+        (METRIC_CURSOR_RELEASE_DAY, _day(release_date))
+        for release_date in release_dates
+        if release_date is not None
+    )
+    increment(db, deltas)
+
+
+def load_counters(db, metrics: List[str]) -> Dict[str, Dict[str, int]]:
+    """一次查询读取多个指标的全部计数，返回 {指标: {维度: 计数}}"""
+    counters: Dict[str, Dict[str, int]] = {metric: {} for metric in metrics}
+    rows = (
+        db.query(StatCounter.metric, StatCounter.dimension, StatCounter.value)
+        .filter(StatCounter.metric.in_(metrics))
+        .all()
+    )
+    for metric, dimension, value in rows:
+        counters[metric][dimension] = value or 0
+    return counters
+
+
+def backfill_if_needed():
+    """
+    计数表首次启用时从原始表聚合回填（应用启动时调用）
+
+    回填标记与计数在同一事务中写入，多个副本同时启动时只有一个能写入标记
+    """
+    with get_db_context() as db:
+        marker = (
+            db.query(StatCounter.id)
+            .filter(
+                StatCounter.metric == BACKFILL_MARKER[0],
+                StatCounter.dimension == BACKFILL_MARKER[1],
+            )
+            .first()
+        )
+        if marker:
+            return
+
+        try:
+            db.add(
+                StatCounter(
+                    metric=BACKFILL_MARKER[0], dimension=BACKFILL_MARKER[1], value=1
+                )
+            )
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            return
+
+        deltas: Dict[CounterKey, int] = {}
+
+        for source, count in (
+            db.query(NewsArticle.source, func.count(NewsArticle.id))
+            .group_by(NewsArticle.source)
+            .all()
+        ):
+            deltas[(METRIC_NEWS_SOURCE, source or "")] = count
+
+        for category_id, count in (
+            db.query(NewsArticle.category_id, func.count(NewsArticle.id))
+            .group_by(NewsArticle.category_id)
+            .all()
+        ):
+            key = "" if category_id is None else str(category_id)
+            deltas[(METRIC_NEWS_CATEGORY, key)] = count
+
+        news_day = func.date(NewsArticle.created_at)
+        for day, count in (
+            db.query(news_day, func.count(NewsArticle.id)).group_by(news_day).all()
+        ):
+            if day is not None:
+                deltas[(METRIC_NEWS_DAY, _day(day))] = count
+
+        release_day = func.date(CursorUpdate.release_date)
+        for day, count in (
+            db.query(release_day, func.count(CursorUpdate.id))
+            .group_by(release_day)
+            .all()
+        ):
+            if day is not None:
+                deltas[(METRIC_CURSOR_RELEASE_DAY, _day(day))] = count
+
+        succeeded = func.sum(
+            case((CollectorLog.status == CollectorLog.STATUS_SUCCESS, 1), else_=0)
+        )
+        for name, runs, success, items in (
+            db.query(
+                CollectorLog.collector_name,
+                func.count(CollectorLog.id),
+                succeeded,
+                func.sum(CollectorLog.items_collected),
+            )
+            .group_by(CollectorLog.collector_name)
+            .all()
+        ):
+            deltas[(METRIC_COLLECTOR_RUNS, name or "")] = runs
+            deltas[(METRIC_COLLECTOR_SUCCESS, name or "")] = int(success or 0)
+            deltas[(METRIC_COLLECTOR_ITEMS, name or "")] = int(items or 0)
+
+        increment(db, deltas)
+        db.commit()
+        logger.info(f"统计计数回填完成，共 {len(deltas)} 个计数")
@@ -1,13 +1,186 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+
+from database import get_db
+from models import CollectorLog
+from collectors.manager import collector_manager
+from collectors.telemetry import PHASES
+from pagination import InvalidCursor, keyset_paginate
+from scheduler import collector_scheduler
 
 router = APIRouter()
 
+# 延迟统计的分位数
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _run_to_dict(log: CollectorLog) -> Dict[str, Any]:
+    return {
+        "id": log.id,
+        "collector": log.collector_name,
+        "status": log.status,
+        "message": log.message,
+        "items_collected": log.items_collected,
+        "started_at": log.started_at,
+        "finished_at": log.created_at,
+        "duration_ms": log.duration_ms,
+        "phases_ms": {name: getattr(log, f"{name}_ms") or 0 for name in PHASES},
+        "api_calls": log.api_calls or 0,
+        "cache_hits": log.cache_hits or 0,
+        "error_count": log.error_count or 0,
+        "errors": log.errors or [],
+    }
+
+
+def _percentile(sorted_values: List[int], p: float) -> float:
+    """线性插值计算分位数（sorted_values 已升序）"""
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def _latency_summary(values: List[Optional[int]]) -> Optional[Dict[str, float]]:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    summary = {f"p{p}": round(_percentile(values, p), 1) for p in PERCENTILES}
+    summary["max"] = values[-1]
+    summary["avg"] = round(sum(values) / len(values), 1)
+    return summary
+
 
 @router.get("/")
-async def get_collectors():
-    return {"message": "收集器列表"}
+async def get_collectors(db: Session = Depends(get_db)):
+    """获取收集器列表及最近一次运行记录"""
+    collectors = []
+    for info in collector_manager.get_collector_list():
+        last_run = (
+            db.query(CollectorLog)
+            .filter(CollectorLog.collector_name == info["name"])
+            .order_by(CollectorLog.id.desc())
+            .first()
+        )
+        collectors.append(
+            {**info, "last_run": _run_to_dict(last_run) if last_run else None}
+        )
+    return {"success": True, "data": collectors}
 
 
 @router.post("/run/{collector_name}")
 async def run_collector(collector_name: str):
-    return {"message": f"运行收集器 {collector_name}"}
+    """手动运行收集器（与定时调度相同的保存流程和每日调用次数限制，不经过调度租约）"""
+    if not collector_manager.get_collector(collector_name):
+        raise HTTPException(status_code=404, detail=f"收集器 '{collector_name}' 不存在")
+    return await collector_manager.run_collector(collector_name)
+
+
+@router.get("/runs")
+async def get_collector_runs(
+    collector: Optional[str] = Query(None, description="按收集器名称筛选"),
+    status: Optional[str] = Query(None, description="按状态筛选（success / failed）"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    db: Session = Depends(get_db),
+):
+    """获取收集器运行历史（按时间倒序，keyset 分页）"""
+    query = db.query(CollectorLog)
+    if collector:
+        query = query.filter(CollectorLog.collector_name == collector)
+    if status:
+        query = query.filter(CollectorLog.status == status)
+
+    try:
+        runs, next_cursor = keyset_paginate(
+            query, CollectorLog.created_at, CollectorLog.id, limit, cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "success": True,
+        "data": [_run_to_dict(run) for run in runs],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/runs/{run_id}")
+async def get_collector_run(run_id: int, db: Session = Depends(get_db)):
+    """获取单次运行记录"""
+    run = db.query(CollectorLog).filter(CollectorLog.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="运行记录不存在")
+    return {"success": True, "data": _run_to_dict(run)}
+
+
+@router.get("/latency")
+async def get_collector_latency(
+    collector: Optional[str] = Query(None, description="只统计指定收集器"),
+    window: int = Query(200, ge=1, le=5000, description="统计最近多少次运行"),
+    db: Session = Depends(get_db),
+):
+    """按收集器统计最近运行的耗时分位数（总耗时和各阶段）、LLM 调用次数和成功率"""
+    if collector:
+        names = [collector]
+    else:
+        names = [
+            name
+            for (name,) in db.query(CollectorLog.collector_name).distinct().all()
+            if name
+        ]
+
+    phase_columns = [getattr(CollectorLog, f"{name}_ms") for name in PHASES]
+    data = []
+    for name in sorted(names):
+        rows = (
+            db.query(
+                CollectorLog.status,
+                CollectorLog.duration_ms,
+                CollectorLog.api_calls,
+                CollectorLog.cache_hits,
+                CollectorLog.items_collected,
+                *phase_columns,
+            )
+            .filter(CollectorLog.collector_name == name)
+            .order_by(CollectorLog.id.desc())
+            .limit(window)
+            .all()
+        )
+        if not rows:
+            continue
+
+        succeeded = sum(1 for row in rows if row.status == CollectorLog.STATUS_SUCCESS)
+        api_calls = sum(row.api_calls or 0 for row in rows)
+        data.append(
+            {
+                "collector": name,
+                "runs": len(rows),
+                "success_rate": round(succeeded / len(rows) * 100, 1),
+                "items_collected": sum(row.items_collected or 0 for row in rows),
+                "api_calls": {
+                    "total": api_calls,
+                    "avg_per_run": round(api_calls / len(rows), 2),
+                },
+                "cache_hits": sum(row.cache_hits or 0 for row in rows),
+                "latency_ms": {
+                    "total": _latency_summary([row.duration_ms for row in rows]),
+                    **{
+                        phase: _latency_summary(
+                            [getattr(row, f"{phase}_ms") for row in rows]
+                        )
+                        for phase in PHASES
+                    },
+                },
+            }
+        )
+
+    return {"success": True, "window": window, "data": data}
+
+
+@router.get("/schedules")
+async def get_schedules():
+    """获取定时采集任务及下次运行时间"""
+    return {"success": True, "data": collector_scheduler.get_jobs()}
@@ -1,32 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_db_context
+from job_queue import Job, job_queue
 from models import CursorUpdate
 from schemas import CursorUpdateResponse, CursorUpdateListResponse
 from collectors.cursor_collector import CursorCollector
+from collectors.upsert import bulk_upsert_cursor_updates
+from websocket_manager import ProgressReporter
+from pagination import InvalidCursor, count_cache, encode_cursor, keyset_paginate
+from response_cache import (
+    CURSOR_NAMESPACE,
+    DASHBOARD_NAMESPACE,
+    cached_response,
+    response_cache,
+)
+from collectors.telemetry import log_collector_run, phase, track_run
 
 router = APIRouter(prefix="/cursor", tags=["cursor"])
 
+# 后台任务类型
+CURSOR_COLLECT_JOB = "cursor_collect"
+
+# 运行记录中的收集器名称（与 CursorCollector.name 一致）
+CURSOR_COLLECTOR_NAME = "cursor_collector"
+
+# 列表总数缓存键
+CURSOR_UPDATES_COUNT_KEY = "cursor_updates"
+
 
 @router.get("/updates", response_model=CursorUpdateListResponse)
+@cached_response(CURSOR_NAMESPACE, ttl=120)
 async def get_cursor_updates(
-    skip: int = Query(0, ge=0),
+    request: Request,
+    skip: int = Query(0, ge=0, description="偏移量（兼容旧客户端，建议改用 cursor）"),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    include_total: bool = Query(True, description="是否返回总数（缓存值）"),
     db: Session = Depends(get_db),
 ):
-    """获取 Cursor 更新日志列表"""
+    """获取 Cursor 更新日志列表（按发布日期倒序，keyset 分页）"""
     query = db.query(CursorUpdate).filter(CursorUpdate.is_active == True)
 
-    total = query.count()
-    updates = (
-        query.order_by(CursorUpdate.release_date.desc()).offset(skip).limit(limit).all()
-    )
+    total = count_cache.get(CURSOR_UPDATES_COUNT_KEY, query) if include_total else None
+
+    if skip and not cursor:
+        # 旧的 OFFSET 分页
+        updates = (
+            query.order_by(CursorUpdate.release_date.desc(), CursorUpdate.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        next_cursor = None
+        if len(updates) == limit:
+            last = updates[-1]
+            next_cursor = encode_cursor(last.release_date, last.id)
+    else:
+        try:
+            updates, next_cursor = keyset_paginate(
+                query, CursorUpdate.release_date, CursorUpdate.id, limit, cursor
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     return CursorUpdateListResponse(
-        updates=updates, total=total, skip=skip, limit=limit
+        updates=updates,
+        total=total,
+        skip=skip,
+        limit=limit,
+        next_cursor=next_cursor,
     )
 
 
@@ -62,87 +107,127 @@ async def get_latest_cursor_update(db: Session = Depends(get_db)):
 
 
 @router.post("/collect")
-async def collect_cursor_updates(db: Session = Depends(get_db)):
-    """手动触发 Cursor 更新日志采集"""
-    try:
-        collector = CursorCollector()
-
-        # 设置数据库会话，让采集器能够检查版本是否已存在
-        collector.db_session = db
-
-        items = await collector.collect()
-
-        saved_count = 0
-        updated_count = 0
-        collection_info = {}
-
-        # 获取采集信息
-        if items and "collection_info" in items[0].extra_data:
-            collection_info = items[0].extra_data["collection_info"]
-
-        for item in items:
-            # 检查是否已存在
-            existing = (
-                db.query(CursorUpdate)
-                .filter(CursorUpdate.version == item.extra_data.get("version", ""))
-                .first()
+async def collect_cursor_updates(
+    force: bool = Query(False, description="忽略条件请求，强制重新解析"),
+):
+    """提交 Cursor 更新日志采集任务，立即返回任务ID（已有任务在执行时直接返回该任务）"""
+    for job in job_queue.list(CURSOR_COLLECT_JOB):
+        if not job.finished:
+            return {
+                "success": True,
+                "message": "已有采集任务在执行",
+                "job_id": job.id,
+                "status": job.status,
+            }
+
+    job = job_queue.enqueue(CURSOR_COLLECT_JOB, force=force)
+    return {
+        "success": True,
+        "message": "采集任务已提交",
+        "job_id": job.id,
+        "status": job.status,
+    }
+
+
+async def run_cursor_collect_job(job: Job) -> Dict[str, Any]:
+    """后台任务：采集 Cursor 更新日志并写入数据库（任务使用独立的数据库会话）"""
+    with track_run() as telemetry, get_db_context() as db:
+        try:
+            result = await _collect_and_save(
+                db, job.params.get("force", False), job.id
             )
+        except Exception as e:
+            db.rollback()
+            telemetry.record_error(str(e))
+            log_collector_run(
+                CURSOR_COLLECTOR_NAME, False, message=str(e), telemetry=telemetry
+            )
+            raise
+
+    log_collector_run(
+        CURSOR_COLLECTOR_NAME,
+        True,
+        result["saved_count"],
+        message=result["message"],
+        telemetry=telemetry,
+    )
+    result["telemetry"] = telemetry.to_dict()
+    return result
 
-            if existing:
-                # 更新现有记录
-                existing.title = item.title
-                existing.translated_title = item.extra_data.get("translated_title", "")
-                existing.original_content = item.extra_data.get("original_content", "")
-                existing.translated_content = item.extra_data.get(
-                    "translated_content", ""
-                )
-                existing.analysis = item.extra_data.get("analysis", "")
-                existing.url = item.url
-                existing.collected_at = datetime.utcnow()
-                existing.updated_at = datetime.utcnow()
-                if item.extra_data.get("collection_status") == "new":
-                    updated_count += 1
-            else:
-                # 创建新记录
-                cursor_update = CursorUpdate(
-                    version=item.extra_data.get("version", ""),
-                    release_date=item.published_at or datetime.utcnow(),
-                    title=item.title,
-                    translated_title=item.extra_data.get("translated_title", ""),
-                    original_content=item.extra_data.get("original_content", ""),
-                    translated_content=item.extra_data.get("translated_content", ""),
-                    analysis=item.extra_data.get("analysis", ""),
-                    url=item.url,
-                    collected_at=datetime.utcnow(),
-                    is_major=item.extra_data.get("is_major", False),
-                )
-                db.add(cursor_update)
-                saved_count += 1
 
-        db.commit()
+async def _collect_and_save(
+    db: Session, force: bool, job_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """采集 Cursor 更新日志并批量写入，返回采集结果"""
+    collector = CursorCollector()
 
+    # 设置数据库会话，让采集器能够检查版本是否已存在
+    collector.db_session = db
+    collector.force_refresh = force
+    collector.progress_reporter = ProgressReporter("cursor_collection", job_id=job_id)
+
+    items = await collector.collect()
+
+    # 获取采集信息
+    collection_info = collector.last_collection_info
+
+    if collection_info.get("unchanged"):
+        collector.save_fetch_state(db)
+        db.commit()
         return {
             "success": True,
-            "message": f"采集完成！共处理 {len(items)} 个版本，新增 {saved_count} 个，更新 {updated_count} 个",
-            "total_items": len(items),
-            "saved_count": saved_count,
-            "updated_count": updated_count,
-            "collection_info": {
-                "total_versions": collection_info.get("total_versions", 0),
-                "new_versions": collection_info.get("new_versions", 0),
-                "existing_versions": collection_info.get("existing_versions", 0),
-                "api_calls_made": collection_info.get("api_calls_made", 0),
-                "processing_details": collection_info.get("processing_details", []),
-            },
+            "message": "Cursor 更新日志未变化，无需采集",
+            "unchanged": True,
+            "total_items": 0,
+            "saved_count": 0,
+            "updated_count": 0,
+            "collection_info": collection_info,
         }
 
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"采集失败: {str(e)}")
+    # 批量 upsert：每个块一次写入往返
+    with phase("persist"):
+        result = bulk_upsert_cursor_updates(db, items)
+        # 抓取状态与数据同一事务提交；有版本写入失败时不记录，下次重新处理
+        if not result.failed:
+            collector.save_fetch_state(db)
+        db.commit()
+    saved_count = result.inserted_count
+
+    # 只统计本次重新调用 API 的已存在版本
+    updated_versions = set(result.updated)
+    updated_count = sum(
+        1
+        for item in items
+        if item.extra_data.get("version", "") in updated_versions
+        and item.extra_data.get("collection_status") == "new"
+    )
+
+    count_cache.invalidate(CURSOR_UPDATES_COUNT_KEY)
+    await response_cache.invalidate(CURSOR_NAMESPACE, DASHBOARD_NAMESPACE)
+
+    return {
+        "success": True,
+        "message": f"采集完成！共处理 {len(items)} 个版本，新增 {saved_count} 个，更新 {updated_count} 个",
+        "total_items": len(items),
+        "saved_count": saved_count,
+        "updated_count": updated_count,
+        "failed_count": len(result.failed),
+        "collection_info": {
+            "total_versions": collection_info.get("total_versions", 0),
+            "new_versions": collection_info.get("new_versions", 0),
+            "existing_versions": collection_info.get("existing_versions", 0),
+            "api_calls_made": collection_info.get("api_calls_made", 0),
+            "processing_details": collection_info.get("processing_details", []),
+        },
+    }
+
+
+job_queue.register(CURSOR_COLLECT_JOB, run_cursor_collect_job)
 
 
 @router.get("/stats")
-async def get_cursor_stats(db: Session = Depends(get_db)):
+@cached_response(CURSOR_NAMESPACE, ttl=300)
+async def get_cursor_stats(request: Request, db: Session = Depends(get_db)):
     """获取 Cursor 更新统计信息"""
     total_updates = (
         db.query(CursorUpdate).filter(CursorUpdate.is_active == True).count()
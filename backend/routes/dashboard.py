@@ -1,17 +1,179 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from datetime import date, datetime, timedelta
+
+from database import get_db
+from models import Category
+from collectors.manager import collector_manager
+from response_cache import DASHBOARD_NAMESPACE, cached_response
+from rollups import (
+    METRIC_COLLECTOR_ITEMS,
+    METRIC_COLLECTOR_RUNS,
+    METRIC_COLLECTOR_SUCCESS,
+    METRIC_CURSOR_RELEASE_DAY,
+    METRIC_NEWS_CATEGORY,
+    METRIC_NEWS_DAY,
+    METRIC_NEWS_SOURCE,
+    load_counters,
+)
 
 router = APIRouter()
 
+ALL_METRICS = [
+    METRIC_NEWS_SOURCE,
+    METRIC_NEWS_CATEGORY,
+    METRIC_NEWS_DAY,
+    METRIC_CURSOR_RELEASE_DAY,
+    METRIC_COLLECTOR_RUNS,
+    METRIC_COLLECTOR_SUCCESS,
+    METRIC_COLLECTOR_ITEMS,
+]
+
+
+def _sum_days(day_counts: Dict[str, int], start: date, end: date) -> int:
+    """统计 [start, end] 日期范围内的计数"""
+    start_key, end_key = start.isoformat(), end.isoformat()
+    return sum(count for day, count in day_counts.items() if start_key <= day <= end_key)
+
+
+def _daily_series(day_counts: Dict[str, int], days: int) -> List[Dict[str, Any]]:
+    """最近 days 天的每日计数，没有数据的日期补 0"""
+    today = datetime.utcnow().date()
+    series = []
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        series.append({"date": day, "count": day_counts.get(day, 0)})
+    return series
+
+
+def _collector_stats(counters: Dict[str, Dict[str, int]]) -> List[Dict[str, Any]]:
+    """按收集器汇总运行次数和成功率"""
+    runs = counters[METRIC_COLLECTOR_RUNS]
+    success = counters[METRIC_COLLECTOR_SUCCESS]
+    items = counters[METRIC_COLLECTOR_ITEMS]
+
+    stats = []
+    for name, total in sorted(runs.items()):
+        succeeded = success.get(name, 0)
+        stats.append(
+            {
+                "name": name,
+                "runs": total,
+                "succeeded": succeeded,
+                "failed": total - succeeded,
+                "success_rate": round(succeeded / total * 100, 1) if total else 0,
+                "items_collected": items.get(name, 0),
+            }
+        )
+    return stats
+
+
+def _cursor_cadence(release_days: Dict[str, int]) -> Dict[str, Any]:
+    """Cursor 发版节奏：发版总数、最近发版日期、平均发版间隔和每月发版数"""
+    days = sorted(day for day, count in release_days.items() if count)
+    today = datetime.utcnow().date()
+
+    avg_interval = None
+    if len(days) > 1:
+        span = date.fromisoformat(days[-1]) - date.fromisoformat(days[0])
+        avg_interval = round(span.days / (len(days) - 1), 1)
+
+    by_month: Dict[str, int] = {}
+    for day in days:
+        by_month[day[:7]] = by_month.get(day[:7], 0) + release_days[day]
+
+    return {
+        "total_releases": sum(release_days.values()),
+        "latest_release": days[-1] if days else None,
+        "avg_days_between_releases": avg_interval,
+        "releases_last_30_days": _sum_days(
+            release_days, today - timedelta(days=29), today
+        ),
+        "releases_last_90_days": _sum_days(
+            release_days, today - timedelta(days=89), today
+        ),
+        "releases_by_month": [
+            {"month": month, "count": count}
+            for month, count in sorted(by_month.items())[-12:]
+        ],
+    }
+
+
+def _summary(counters: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """汇总数字（统计卡片使用）"""
+    news_days = counters[METRIC_NEWS_DAY]
+    today = datetime.utcnow().date()
+    this_week = _sum_days(news_days, today - timedelta(days=6), today)
+    last_week = _sum_days(
+        news_days, today - timedelta(days=13), today - timedelta(days=7)
+    )
+
+    runs = sum(counters[METRIC_COLLECTOR_RUNS].values())
+    succeeded = sum(counters[METRIC_COLLECTOR_SUCCESS].values())
+
+    return {
+        "total_news": sum(counters[METRIC_NEWS_SOURCE].values()),
+        "today_news": news_days.get(today.isoformat(), 0),
+        "week_news": this_week,
+        "weekly_growth": (
+            round((this_week - last_week) / last_week * 100, 1) if last_week else 0
+        ),
+        "cursor_updates": sum(counters[METRIC_CURSOR_RELEASE_DAY].values()),
+        "active_collectors": len(collector_manager.collectors),
+        "collector_runs": runs,
+        "collector_success_rate": round(succeeded / runs * 100, 1) if runs else 0,
+    }
+
 
 @router.get("/")
-async def get_dashboard():
-    """获取仪表盘数据"""
-    # TODO #3 数据收集器: 实现仪表盘数据接口
-    return {"message": "仪表盘接口待实现"}
+@cached_response(DASHBOARD_NAMESPACE, ttl=60)
+async def get_dashboard(
+    request: Request,
+    days: int = Query(30, ge=1, le=365, description="每日新闻计数的天数"),
+    db: Session = Depends(get_db),
+):
+    """获取仪表盘数据（只读取统计计数表）"""
+    counters = load_counters(db, ALL_METRICS)
+
+    # 分类只有少数几个，直接查询名称
+    category_names = {
+        str(category_id): name
+        for category_id, name in db.query(Category.id, Category.name).all()
+    }
+
+    news_by_source = sorted(
+        counters[METRIC_NEWS_SOURCE].items(), key=lambda kv: kv[1], reverse=True
+    )
+    news_by_category = sorted(
+        counters[METRIC_NEWS_CATEGORY].items(), key=lambda kv: kv[1], reverse=True
+    )
+
+    return {
+        "success": True,
+        "data": {
+            "summary": _summary(counters),
+            "news_by_source": [
+                {"source": source, "count": count} for source, count in news_by_source
+            ],
+            "news_by_category": [
+                {
+                    "category_id": int(category_id) if category_id else None,
+                    "category": category_names.get(category_id, "未分类"),
+                    "count": count,
+                }
+                for category_id, count in news_by_category
+            ],
+            "news_by_day": _daily_series(counters[METRIC_NEWS_DAY], days),
+            "collectors": _collector_stats(counters),
+            "cursor_cadence": _cursor_cadence(counters[METRIC_CURSOR_RELEASE_DAY]),
+        },
+    }
 
 
 @router.get("/stats")
-async def get_dashboard_stats():
-    """获取统计信息"""
-    # TODO #3 数据收集器: 实现统计信息接口
-    return {"message": "统计信息接口待实现"}
+@cached_response(DASHBOARD_NAMESPACE, ttl=60)
+async def get_dashboard_stats(request: Request, db: Session = Depends(get_db)):
+    """获取统计信息（只读取统计计数表）"""
+    counters = load_counters(db, ALL_METRICS)
+    return {"success": True, "data": _summary(counters)}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from job_queue import job_queue
+
+router = APIRouter()
+
+
+@router.get("/")
+async def list_jobs(
+    job_type: Optional[str] = Query(None, description="任务类型，如 cursor_collect"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """获取最近提交的后台任务"""
+    jobs = job_queue.list(job_type, limit)
+    return {
+        "success": True,
+        "data": [job.to_dict() for job in jobs],
+        "count": len(jobs),
+        "pending": job_queue.pending_count(),
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """获取任务状态，任务完成后 result 字段包含执行结果"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return job.to_dict()
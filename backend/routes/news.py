@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import String, cast, func
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import json
 import logging
 from datetime import datetime
 
-from database import get_db
+from database import get_db, get_db_context
+from job_queue import Job, job_queue
 from models import NewsArticle, APICallRecord
 from collectors.manager import CollectorManager
 from collectors.ai_news_collector import AINewsCollector
 from config import settings
+from pagination import InvalidCursor, count_cache, keyset_paginate
+from response_cache import (
+    DASHBOARD_NAMESPACE,
+    NEWS_NAMESPACE,
+    cached_response,
+    response_cache,
+)
+from collectors.telemetry import log_collector_run
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -16,85 +27,166 @@ logger = logging.getLogger(__name__)
 # 创建收集器管理器实例
 collector_manager = CollectorManager()
 
+# 后台任务类型
+AI_NEWS_COLLECT_JOB = "ai_news_collect"
+
+
+# 列表接口可以返回的字段
+NEWS_FIELDS = {
+    "id": NewsArticle.id,
+    "title": NewsArticle.title,
+    "summary": NewsArticle.summary,
+    "content": NewsArticle.content,
+    "url": NewsArticle.url,
+    "source": NewsArticle.source,
+    "author": NewsArticle.author,
+    "published_at": NewsArticle.published_at,
+    "created_at": NewsArticle.created_at,
+    "tags": NewsArticle.tags,
+    "model": NewsArticle.model,
+}
+
+# 未指定 fields 时返回的字段（与原接口保持一致）
+DEFAULT_NEWS_FIELDS = list(NEWS_FIELDS)
+
+
+def parse_news_fields(fields: Optional[str]) -> List[str]:
+    """解析 fields=title,summary,... 参数，id 总是返回"""
+    if not fields:
+        return DEFAULT_NEWS_FIELDS
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in NEWS_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知字段: {', '.join(unknown)}，可选字段: {', '.join(NEWS_FIELDS)}",
+        )
+    return ["id"] + [name for name in names if name != "id"]
+
+
+def list_news(
+    db: Session,
+    fields: List[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    source: Optional[str] = None,
+    model: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    include_total: bool = False,
+) -> Dict[str, Any]:
+    """
+    新闻列表查询：按发布时间倒序 keyset 分页，只查询需要的列
+    """
+    # 分页需要 published_at 和 id，未请求时也要查询但不返回
+    selected = list(dict.fromkeys(fields + ["published_at"]))
+    query = db.query(*(NEWS_FIELDS[name].label(name) for name in selected))
+
+    if source:
+        query = query.filter(NewsArticle.source == source)
+    if model:
+        query = query.filter(NewsArticle.model == model)
+    if tag:
+        if db.get_bind().dialect.name == "mysql":
+            query = query.filter(
+                func.json_contains(NewsArticle.tags, json.dumps(tag)) == 1
+            )
+        else:
+            # 其它数据库把 JSON 当作文本匹配（写入时使用 json.dumps 的转义形式）
+            query = query.filter(
+                cast(NewsArticle.tags, String).contains(json.dumps(tag), autoescape=True)
+            )
+    if date_from:
+        query = query.filter(NewsArticle.published_at >= date_from)
+    if date_to:
+        query = query.filter(NewsArticle.published_at <= date_to)
+
+    total = None
+    if include_total:
+        total = count_cache.get(
+            f"news:{source}:{model}:{tag}:{date_from}:{date_to}", query
+        )
 
-@router.get("/")
-async def get_news(db: Session = Depends(get_db)):
-    """获取所有新闻"""
     try:
-        news_articles = (
-            db.query(NewsArticle)
-            .order_by(NewsArticle.published_at.desc())
-            .limit(50)
-            .all()
+        rows, next_cursor = keyset_paginate(
+            query, NewsArticle.published_at, NewsArticle.id, limit, cursor
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    news_list = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = getattr(row, name)
+            item[name] = value.isoformat() if isinstance(value, datetime) else value
+        news_list.append(item)
+
+    result = {
+        "success": True,
+        "data": news_list,
+        "count": len(news_list),
+        "next_cursor": next_cursor,
+    }
+    if include_total:
+        result["total"] = total
+    return result
 
-        # 转换为字典格式
-        news_list = []
-        for article in news_articles:
-            news_list.append(
-                {
-                    "id": article.id,
-                    "title": article.title,
-                    "summary": article.summary,
-                    "content": article.content,
-                    "url": article.url,
-                    "source": article.source,
-                    "author": article.author,
-                    "published_at": (
-                        article.published_at.isoformat()
-                        if article.published_at
-                        else None
-                    ),
-                    "created_at": (
-                        article.created_at.isoformat() if article.created_at else None
-                    ),
-                    "tags": article.tags,
-                    "model": article.model,
-                }
-            )
 
-        return {"success": True, "data": news_list, "count": len(news_list)}
+@router.get("/")
+@cached_response(NEWS_NAMESPACE, ttl=60)
+async def get_news(
+    request: Request,
+    source: Optional[str] = Query(None, description="新闻来源"),
+    model: Optional[str] = Query(None, description="AI模型名称"),
+    tag: Optional[str] = Query(None, description="标签"),
+    date_from: Optional[datetime] = Query(None, description="发布时间起"),
+    date_to: Optional[datetime] = Query(None, description="发布时间止"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，如 title,summary"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    include_total: bool = Query(False, description="是否返回总数（缓存值）"),
+    db: Session = Depends(get_db),
+):
+    """获取新闻列表（支持过滤、字段投影和 keyset 分页）"""
+    try:
+        return list_news(
+            db,
+            parse_news_fields(fields),
+            limit,
+            cursor,
+            source=source,
+            model=model,
+            tag=tag,
+            date_from=date_from,
+            date_to=date_to,
+            include_total=include_total,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取新闻列表失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取新闻列表失败: {str(e)}")
 
 
 @router.get("/ai")
-async def get_ai_news(db: Session = Depends(get_db)):
+@cached_response(NEWS_NAMESPACE, ttl=60)
+async def get_ai_news(
+    request: Request,
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔"),
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    db: Session = Depends(get_db),
+):
     """获取AI新闻"""
     try:
-        ai_news = (
-            db.query(NewsArticle)
-            .filter(NewsArticle.source == "AI新闻助手")
-            .order_by(NewsArticle.published_at.desc())
-            .limit(20)
-            .all()
+        return list_news(
+            db, parse_news_fields(fields), limit, cursor, source="AI新闻助手"
         )
-
-        news_list = []
-        for article in ai_news:
-            news_list.append(
-                {
-                    "id": article.id,
-                    "title": article.title,
-                    "summary": article.summary,
-                    "content": article.content,
-                    "url": article.url,
-                    "source": article.source,
-                    "author": article.author,
-                    "published_at": (
-                        article.published_at.isoformat()
-                        if article.published_at
-                        else None
-                    ),
-                    "created_at": (
-                        article.created_at.isoformat() if article.created_at else None
-                    ),
-                    "tags": article.tags,
-                }
-            )
-
-        return {"success": True, "data": news_list, "count": len(news_list)}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取AI新闻失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取AI新闻失败: {str(e)}")
@@ -102,7 +194,7 @@ async def get_ai_news(db: Session = Depends(get_db)):
 
 @router.post("/ai/collect")
 async def collect_ai_news(db: Session = Depends(get_db)):
-    """手动触发AI新闻收集 - 每日限制3次"""
+    """提交AI新闻收集任务 - 每日限制3次，立即返回任务ID"""
     try:
         # 🔒 检查每日调用次数限制
         today = datetime.now().strftime("%Y-%m-%d")
@@ -123,87 +215,110 @@ async def collect_ai_news(db: Session = Depends(get_db)):
             )
 
         # 获取AI新闻收集器
-        ai_collector = collector_manager.get_collector("AI新闻收集器")
-        if not ai_collector:
+        if not collector_manager.get_collector("AI新闻收集器"):
             raise HTTPException(status_code=404, detail="AI新闻收集器未找到")
 
-        # 运行收集器
-        result = await ai_collector.run()
-
-        if result["success"]:
-            # 保存新闻到数据库
-            items = result.get("items", [])
-            saved_count = 0
-
-            for item in items:
-                try:
-                    # 检查是否已存在相同标题的新闻
-                    existing = (
-                        db.query(NewsArticle)
-                        .filter(
-                            NewsArticle.title == item.title,
-                            NewsArticle.source == item.source,
-                        )
-                        .first()
-                    )
-
-                    if not existing:
-                        news_article = NewsArticle(
-                            title=item.title,
-                            summary=item.summary,
-                            content=item.content,
-                            url=item.url,
-                            source=item.source,
-                            author=item.author,
-                            published_at=item.published_at,
-                            tags=item.tags,
-                            model=item.model,
-                        )
-                        db.add(news_article)
-                        saved_count += 1
-
-                except Exception as e:
-                    logger.error(f"保存新闻项失败: {str(e)}")
-                    continue
+        # 已有任务在执行时直接返回该任务，避免重复消耗调用次数
+        for job in job_queue.list(AI_NEWS_COLLECT_JOB):
+            if not job.finished:
+                return {
+                    "success": True,
+                    "message": "已有AI新闻收集任务在执行",
+                    "job_id": job.id,
+                    "status": job.status,
+                }
+
+        job = job_queue.enqueue(AI_NEWS_COLLECT_JOB)
+        return {
+            "success": True,
+            "message": "AI新闻收集任务已提交",
+            "job_id": job.id,
+            "status": job.status,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"AI新闻收集失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"AI新闻收集失败: {str(e)}")
 
-            db.commit()
 
-            # 🔒 更新API调用记录
-            if api_record:
-                api_record.call_count += 1
-                api_record.last_call_time = datetime.now()
-                api_record.updated_at = datetime.now()
-            else:
-                # 创建新的调用记录
-                api_record = APICallRecord(
-                    api_name=APICallRecord.API_AI_NEWS_COLLECT,
-                    call_date=today,
-                    call_count=1,
-                    last_call_time=datetime.now(),
-                )
-                db.add(api_record)
+async def run_ai_news_collect_job(job: Job) -> Dict[str, Any]:
+    """后台任务：运行AI新闻收集器并保存结果（任务使用独立的数据库会话）"""
+    # 每个任务使用独立的收集器实例，流式进度会带上任务ID
+    template = collector_manager.get_collector("AI新闻收集器")
+    ai_collector = AINewsCollector(template.name, test_mode=template.test_mode)
+    ai_collector.job_id = job.id
 
+    # 运行收集器
+    result = await ai_collector.run()
+    telemetry = result.pop("telemetry")
+
+    if not result["success"]:
+        log_collector_run(
+            ai_collector.name,
+            False,
+            message=result.get("error", ""),
+            telemetry=telemetry,
+        )
+        return {
+            "success": False,
+            "error": result.get("error", "收集失败"),
+            "execution_time": result.get("execution_time", 0),
+        }
+
+    with get_db_context() as db:
+        # 保存新闻到数据库：与定时采集共用批量写入（去重、分类和统计计数一致）
+        items = result.get("items", [])
+        with telemetry.phase("persist"):
+            new_items = await collector_manager.filter_duplicates(db, items)
+            upsert_result = await collector_manager.save_news_articles(db, new_items)
+            saved_count = upsert_result.inserted_count
             db.commit()
 
-            return {
-                "success": True,
-                "message": f"成功收集并保存 {saved_count} 条AI新闻",
-                "collected_count": result["count"],
-                "saved_count": saved_count,
-                "execution_time": result["execution_time"],
-                "remaining_calls": settings.daily_ai_collect_limit
-                - api_record.call_count,  # 🔒 返回剩余调用次数
-            }
+        # 🔒 更新API调用记录
+        today = datetime.now().strftime("%Y-%m-%d")
+        api_record = (
+            db.query(APICallRecord)
+            .filter(
+                APICallRecord.api_name == APICallRecord.API_AI_NEWS_COLLECT,
+                APICallRecord.call_date == today,
+            )
+            .first()
+        )
+        if api_record:
+            api_record.call_count += 1
+            api_record.last_call_time = datetime.now()
+            api_record.updated_at = datetime.now()
         else:
-            return {
-                "success": False,
-                "error": result.get("error", "收集失败"),
-                "execution_time": result.get("execution_time", 0),
-            }
+            # 创建新的调用记录
+            api_record = APICallRecord(
+                api_name=APICallRecord.API_AI_NEWS_COLLECT,
+                call_date=today,
+                call_count=1,
+                last_call_time=datetime.now(),
+            )
+            db.add(api_record)
 
-    except Exception as e:
-        logger.error(f"AI新闻收集失败: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"AI新闻收集失败: {str(e)}")
+        db.commit()
+        count_cache.invalidate()
+        await response_cache.invalidate(NEWS_NAMESPACE, DASHBOARD_NAMESPACE)
+
+        log_collector_run(ai_collector.name, True, saved_count, telemetry=telemetry)
+
+        return {
+            "success": True,
+            "message": f"成功收集并保存 {saved_count} 条AI新闻",
+            "collected_count": result["count"],
+            "saved_count": saved_count,
+            "execution_time": result["execution_time"],
+            "remaining_calls": settings.daily_ai_collect_limit
+            - api_record.call_count,  # 🔒 返回剩余调用次数
+            "telemetry": telemetry.to_dict(),
+        }
+
+
+job_queue.register(AI_NEWS_COLLECT_JOB, run_ai_news_collect_job)
 
 
 @router.get("/ai/status")
@@ -281,7 +396,8 @@ async def get_news_detail(news_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/sources/list")
-async def get_news_sources(db: Session = Depends(get_db)):
+@cached_response(NEWS_NAMESPACE, ttl=300)
+async def get_news_sources(request: Request, db: Session = Depends(get_db)):
     """获取新闻来源列表"""
     try:
         sources = db.query(NewsArticle.source).distinct().all()
@@ -294,46 +410,24 @@ async def get_news_sources(db: Session = Depends(get_db)):
 
 
 @router.get("/sources/{source_name}")
-async def get_news_by_source(source_name: str, db: Session = Depends(get_db)):
+@cached_response(NEWS_NAMESPACE, ttl=60)
+async def get_news_by_source(
+    request: Request,
+    source_name: str,
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔"),
+    limit: int = Query(30, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    db: Session = Depends(get_db),
+):
     """根据来源获取新闻"""
     try:
-        news_articles = (
-            db.query(NewsArticle)
-            .filter(NewsArticle.source == source_name)
-            .order_by(NewsArticle.published_at.desc())
-            .limit(30)
-            .all()
+        result = list_news(
+            db, parse_news_fields(fields), limit, cursor, source=source_name
         )
-
-        news_list = []
-        for article in news_articles:
-            news_list.append(
-                {
-                    "id": article.id,
-                    "title": article.title,
-                    "summary": article.summary,
-                    "content": article.content,
-                    "url": article.url,
-                    "source": article.source,
-                    "author": article.author,
-                    "published_at": (
-                        article.published_at.isoformat()
-                        if article.published_at
-                        else None
-                    ),
-                    "created_at": (
-                        article.created_at.isoformat() if article.created_at else None
-                    ),
-                    "tags": article.tags,
-                }
-            )
-
-        return {
-            "success": True,
-            "data": news_list,
-            "count": len(news_list),
-            "source": source_name,
-        }
+        result["source"] = source_name
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取来源新闻失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取来源新闻失败: {str(e)}")
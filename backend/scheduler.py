@@ -0,0 +1,254 @@
+"""
+收集器定时调度
+在应用进程内按间隔或 cron 表达式运行收集器：
+- 触发时间加入随机抖动，避免多个收集器同时启动
+- 上一次运行尚未结束时跳过本次（max_instances=1）
+- 运行前获取租约（数据库或 Redis），多副本部署时同一收集器只在一个副本上运行。
+  租约运行结束后不释放，一直持有到下一个调度时段（间隔减去抖动），
+  各副本的触发时间不同步，提前释放会让其它副本在同一时段内再跑一次
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from collectors.manager import collector_manager
+from config import settings
+from database import get_db_context
+from models import SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+# 当前副本的唯一标识
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class DatabaseLease:
+    """基于 scheduler_leases 表的租约：过期或属于自己的租约才能被获取"""
+
+    def acquire(self, name: str, ttl: float) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+
+        with get_db_context() as db:
+            updated = (
+                db.query(SchedulerLease)
+                .filter(
+                    SchedulerLease.name == name,
+                    or_(
+                        SchedulerLease.expires_at < now,
+                        SchedulerLease.owner == OWNER_ID,
+                    ),
+                )
+                .update(
+                    {
+                        SchedulerLease.owner: OWNER_ID,
+                        SchedulerLease.expires_at: expires_at,
+                        SchedulerLease.acquired_at: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                db.commit()
+                return True
+
+            exists = db.query(SchedulerLease.id).filter(SchedulerLease.name == name)
+            if exists.first():
+                # 租约被其它副本持有
+                db.rollback()
+                return False
+
+            db.add(
+                SchedulerLease(
+                    name=name, owner=OWNER_ID, expires_at=expires_at, acquired_at=now
+                )
+            )
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                # 其它副本同时创建了该租约
+                db.rollback()
+                return False
+
+
+class RedisLease:
+    """基于 Redis SET NX 的租约，到期自动失效"""
+
+    PREFIX = "scheduler_lease:"
+
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2
+        )
+
+    def acquire(self, name: str, ttl: float) -> bool:
+        return bool(
+            self._redis.set(self.PREFIX + name, OWNER_ID, nx=True, ex=int(ttl))
+        )
+
+
+def parse_schedules(raw: str) -> Dict[str, str]:
+    """解析 COLLECTOR_SCHEDULES 配置，格式错误时返回空配置"""
+    try:
+        schedules = json.loads(raw) if raw else {}
+    except json.JSONDecodeError as e:
+        logger.error(f"COLLECTOR_SCHEDULES 不是合法的 JSON: {e}")
+        return {}
+    if not isinstance(schedules, dict):
+        logger.error("COLLECTOR_SCHEDULES 必须是 JSON 对象")
+        return {}
+    return schedules
+
+
+def build_trigger(spec: str, jitter: int):
+    """根据 "interval:秒数" 或 "cron:表达式" 创建触发器"""
+    kind, _, value = spec.partition(":")
+    kind = kind.strip().lower()
+    if kind == "interval":
+        return IntervalTrigger(seconds=int(value), jitter=jitter)
+    if kind == "cron":
+        return CronTrigger.from_crontab(value.strip(), jitter=jitter)
+    raise ValueError(f"无法识别的调度配置: {spec}")
+
+
+def slot_seconds(spec: str) -> float:
+    """
+    两次调度之间的最短间隔（秒）
+
+    cron 表达式取接下来若干次触发之间的最小间隔（不含抖动）
+    """
+    kind, _, value = spec.partition(":")
+    if kind.strip().lower() == "interval":
+        return float(int(value))
+
+    trigger = CronTrigger.from_crontab(value.strip())
+    now = datetime.now(trigger.timezone)
+    fire_times = [trigger.get_next_fire_time(None, now)]
+    for _ in range(24):
+        fire_times.append(trigger.get_next_fire_time(fire_times[-1], fire_times[-1]))
+    return min(
+        (later - earlier).total_seconds()
+        for earlier, later in zip(fire_times, fire_times[1:])
+    )
+
+
+class CollectorScheduler:
+    """收集器定时调度器"""
+
+    def __init__(self):
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._lease = None
+
+    def start(self):
+        """按配置注册定时任务并启动（应用启动时调用）"""
+        if self._scheduler is not None:
+            return
+
+        self._lease = self._create_lease()
+        self._scheduler = AsyncIOScheduler()
+
+        for name, spec in parse_schedules(settings.collector_schedules).items():
+            if not collector_manager.get_collector(name):
+                logger.warning(f"调度配置中的收集器不存在: {name}")
+                continue
+            try:
+                trigger = build_trigger(spec, settings.scheduler_jitter)
+                slot = slot_seconds(spec)
+            except ValueError as e:
+                logger.error(f"收集器 {name} 调度配置错误: {e}")
+                continue
+
+            self._scheduler.add_job(
+                self.run_collector,
+                trigger,
+                args=[name, slot],
+                id=name,
+                max_instances=1,  # 上一次还在运行时跳过本次
+                coalesce=True,  # 错过的多次触发只补跑一次
+                misfire_grace_time=300,
+                replace_existing=True,
+            )
+            logger.info(f"已注册定时采集: {name} ({spec})")
+
+        self._scheduler.start()
+
+    def shutdown(self):
+        """停止调度器（应用关闭时调用）"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def get_jobs(self) -> list:
+        """已注册的定时任务及下次运行时间"""
+        if self._scheduler is None:
+            return []
+        return [
+            {
+                "collector": job.id,
+                "trigger": str(job.trigger),
+                "next_run_time": (
+                    job.next_run_time.isoformat() if job.next_run_time else None
+                ),
+            }
+            for job in self._scheduler.get_jobs()
+        ]
+
+    async def run_collector(self, name: str, slot: float):
+        """
+        获取租约后运行收集器，没有拿到租约说明本时段已经在其它副本上运行过
+
+        抖动只会推迟触发时间，相邻两次触发至少间隔 slot - jitter，
+        租约持有到那时为止（且不短于收集器的运行截止时间），运行结束后不释放
+        """
+        collector = collector_manager.get_collector(name)
+        ttl = max(
+            collector_manager.get_collector_timeout(collector) + 60,
+            slot - settings.scheduler_jitter,
+        )
+
+        try:
+            # 租约使用同步的数据库会话 / Redis 客户端，放到线程中执行，不阻塞事件循环
+            acquired = await asyncio.to_thread(self._lease.acquire, name, ttl)
+        except Exception as e:
+            logger.error(f"获取调度租约失败: {name}: {e}")
+            return
+
+        if not acquired:
+            logger.info(f"收集器 {name} 本时段已在其它副本上运行，跳过本次调度")
+            return
+
+        try:
+            logger.info(f"定时采集开始: {name}")
+            result = await collector_manager.run_collector(name)
+            logger.info(f"定时采集结束: {name} -> {result.get('success')}")
+        except Exception as e:
+            logger.error(f"定时采集失败: {name}: {e}")
+
+    def _create_lease(self):
+        if settings.scheduler_lease_backend == "redis":
+            try:
+                lease = RedisLease(settings.redis_url)
+                lease._redis.ping()
+                return lease
+            except Exception as e:
+                logger.warning(f"Redis 不可用，调度租约改用数据库: {e}")
+        return DatabaseLease()
+
+
+# 全局调度器实例
+collector_scheduler = CollectorScheduler()
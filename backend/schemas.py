@@ -35,9 +35,10 @@ class CursorUpdateListResponse(BaseModel):
     """Cursor 更新列表响应模型"""
 
     updates: List[CursorUpdateResponse]
-    total: int
+    total: Optional[int] = None  # include_total=false 时为空
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # 下一页 cursor，没有更多数据时为空
 
 
 class CursorUpdateCreate(CursorUpdateBase):
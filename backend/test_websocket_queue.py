@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试 WebSocket 发送队列
+连续广播时，跟得上的连接应收到每一条不可合并的消息，
+队列溢出策略只作用于慢连接
+
+用法:
+    python test_websocket_queue.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from websocket_manager import POLICY_COALESCE, WebSocketManager
+
+ROOM = "cursor_collection"
+
+
+class FakeWebSocket:
+    """模拟客户端连接：每次发送让出一次事件循环，慢连接额外等待 delay 秒"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.messages.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def broadcast_and_collect(messages: int = 20):
+    manager = WebSocketManager(
+        send_timeout=5, queue_size=3, overflow_policy=POLICY_COALESCE
+    )
+    fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.05)
+    await manager.connect(fast, "fast", ROOM)
+    await manager.connect(slow, "slow", ROOM)
+
+    for i in range(messages):
+        # 每 5 条插入一条不可合并的消息，其余为可合并的进度快照
+        message_type = "version_update" if i % 5 == 0 else "progress_update"
+        await manager.broadcast_to_room(ROOM, {"type": message_type, "current": i})
+
+    # 等待快连接收齐（慢连接不等）
+    for _ in range(1000):
+        if fast.messages and fast.messages[-1].get("current") == messages - 1:
+            break
+        await asyncio.sleep(0.001)
+
+    for connection_id in list(manager.active_connections):
+        manager.disconnect(connection_id)
+    return fast, slow
+
+
+def _received(websocket: FakeWebSocket, message_type: str):
+    return [m["current"] for m in websocket.messages if m.get("type") == message_type]
+
+
+def test_fast_consumer_receives_every_frame():
+    """快连接收到全部消息（包括每一条不可合并的消息），慢连接的进度消息被合并"""
+    logging.disable(logging.WARNING)
+    fast, slow = asyncio.run(broadcast_and_collect())
+
+    assert _received(fast, "version_update") == [0, 5, 10, 15]
+    assert _received(fast, "progress_update") == [
+        i for i in range(20) if i % 5 != 0
+    ]
+    assert len(_received(slow, "progress_update")) < 16
+
+
+if __name__ == "__main__":
+    test_fast_consumer_receives_every_frame()
+    print("✅ 快连接收到了全部消息，溢出策略只作用于慢连接")
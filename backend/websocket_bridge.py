@@ -0,0 +1,272 @@
+"""
+WebSocket 跨副本广播
+多个 uvicorn worker / 容器部署时，每个进程只持有自己的 WebSocket 连接。
+房间广播除了发给本进程的连接，还通过发布/订阅通道转发给其它副本，
+其它副本收到后再发给各自的连接。
+
+后端由 WEBSOCKET_BRIDGE 选择：redis 使用 settings.redis_url 的 Pub/Sub；
+memory 是进程内的替身（同一进程内的多个管理器互相转发，用于测试和单进程部署）；
+none 不转发。
+
+广播方只把消息放入有界的发布队列，由后台任务逐条发布，
+Redis 卡住时收集器的广播不会被阻塞（队列满或发布超时的消息丢弃）
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Optional, Set
+
+from config import settings
+from metrics import WEBSOCKET_BRIDGE_MESSAGES
+from websocket_manager import WebSocketManager, websocket_manager
+
+logger = logging.getLogger(__name__)
+
+# 广播通道名
+CHANNEL = "logwatcher:websocket"
+
+# 订阅中断后的重连间隔（秒）
+RECONNECT_DELAY = 3
+
+MessageHandler = Callable[[str], Awaitable[None]]
+
+
+class MemoryBroker:
+    """进程内的发布/订阅：每个订阅者一个队列"""
+
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, payload: str):
+        for queue in list(self._subscribers):
+            queue.put_nowait(payload)
+
+
+# 进程内共享的替身通道
+memory_broker = MemoryBroker()
+
+
+class MemoryBridgeBackend:
+    """进程内替身：经 MemoryBroker 转发"""
+
+    def __init__(self, broker: Optional[MemoryBroker] = None):
+        self.broker = broker or memory_broker
+        self._queue: Optional[asyncio.Queue] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        self._queue = self.broker.subscribe()
+        self._listener = asyncio.create_task(self._listen(self._queue, handler))
+
+    async def _listen(self, queue: asyncio.Queue, handler: MessageHandler):
+        while True:
+            await handler(await queue.get())
+
+    async def publish(self, payload: str):
+        self.broker.publish(payload)
+
+    async def stop(self):
+        if self._queue is not None:
+            self.broker.unsubscribe(self._queue)
+            self._queue = None
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+class RedisBridgeBackend:
+    """
+    Redis Pub/Sub
+
+    订阅连接长时间空闲属于正常情况，因此不设置读超时，由 health_check_interval 保活；
+    订阅中断时自动重连，期间的广播会丢失（进度事件可以容忍）
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(
+            url,
+            decode_responses=True,
+            socket_connect_timeout=2,
+            health_check_interval=30,
+        )
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        try:
+            await self._redis.ping()
+        except Exception:
+            await self._redis.aclose()
+            raise
+        self._listener = asyncio.create_task(self._listen(handler))
+
+    async def _listen(self, handler: MessageHandler):
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await handler(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket 广播订阅中断，{RECONNECT_DELAY}s 后重连: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def publish(self, payload: str):
+        await self._redis.publish(CHANNEL, payload)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._redis.aclose()
+
+
+class WebSocketBridge:
+    """
+    把管理器的房间广播转发给其它副本
+
+    启动后挂到 manager.bridge 上，manager 广播时调用 publish 放入发布队列；
+    收到其它副本的广播时只投递给本进程的连接，不再转发
+    """
+
+    def __init__(self, manager: WebSocketManager, backend=None):
+        self.manager = manager
+        self.backend = backend
+        # 等待发布的消息，由 _publisher 任务发送
+        self._outbox: Optional[asyncio.Queue] = None
+        self._publisher: Optional[asyncio.Task] = None
+        # 当前副本的唯一标识，忽略自己发出的消息
+        self.instance_id = (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+
+    def _create_backend(self):
+        backend = settings.websocket_bridge
+        if backend == "redis":
+            return RedisBridgeBackend(settings.redis_url)
+        if backend == "memory":
+            return MemoryBridgeBackend()
+        return None
+
+    async def start(self):
+        """连接后端并开始订阅；Redis 不可用时只在本进程内广播"""
+        if self.backend is None:
+            self.backend = self._create_backend()
+            if self.backend is None:
+                return
+
+        try:
+            await self.backend.start(self._on_message)
+        except Exception as e:
+            logger.warning(f"WebSocket 跨副本广播不可用，只发送给本进程的连接: {e}")
+            self.backend = None
+            return
+
+        self._outbox = asyncio.Queue(maxsize=settings.websocket_bridge_queue_size)
+        self._publisher = asyncio.create_task(self._drain(self._outbox))
+        self.manager.bridge = self
+        logger.info(f"WebSocket 跨副本广播已启用: {type(self.backend).__name__}")
+
+    async def stop(self):
+        if self.manager.bridge is self:
+            self.manager.bridge = None
+        if self._publisher is not None:
+            self._publisher.cancel()
+            try:
+                await self._publisher
+            except asyncio.CancelledError:
+                pass
+            self._publisher = None
+            self._outbox = None
+        if self.backend is not None:
+            await self.backend.stop()
+
+    async def publish(
+        self,
+        room: Optional[str],
+        frame: str,
+        message_type: Optional[str],
+        job_id: Optional[str] = None,
+    ):
+        """
+        转发一帧广播（room 为 None 表示发给所有连接）
+
+        只放入发布队列，不等待发布；队列已满时丢弃该消息
+        """
+        payload = json.dumps(
+            {
+                "origin": self.instance_id,
+                "room": room,
+                "type": message_type,
+                "job_id": job_id,
+                "frame": frame,
+            },
+            ensure_ascii=False,
+        )
+        try:
+            self._outbox.put_nowait(payload)
+        except asyncio.QueueFull:
+            WEBSOCKET_BRIDGE_MESSAGES.inc(direction="dropped")
+
+    async def _drain(self, outbox: asyncio.Queue):
+        """逐条发布队列中的消息；发布超时或失败时只记录日志"""
+        timeout = settings.websocket_bridge_publish_timeout
+        while True:
+            payload = await outbox.get()
+            try:
+                await asyncio.wait_for(self.backend.publish(payload), timeout=timeout)
+                WEBSOCKET_BRIDGE_MESSAGES.inc(direction="published")
+            except asyncio.TimeoutError:
+                WEBSOCKET_BRIDGE_MESSAGES.inc(direction="failed")
+                logger.warning(f"转发 WebSocket 广播超时（{timeout}s），已丢弃")
+            except Exception as e:
+                WEBSOCKET_BRIDGE_MESSAGES.inc(direction="failed")
+                logger.warning(f"转发 WebSocket 广播失败: {e}")
+
+    async def _on_message(self, payload: str):
+        try:
+            message = json.loads(payload)
+            if message.get("origin") == self.instance_id:
+                return
+            WEBSOCKET_BRIDGE_MESSAGES.inc(direction="received")
+            self.manager.deliver(
+                message.get("room"),
+                message["frame"],
+                message.get("type"),
+                message.get("job_id"),
+            )
+        except Exception as e:
+            logger.warning(f"处理其它副本的 WebSocket 广播失败: {e}")
+
+
+# 全局跨副本广播
+websocket_bridge = WebSocketBridge(websocket_manager)
@@ -1,20 +1,146 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, Set, Any, Optional
+from typing import Deque, Dict, Iterable, List, Set, Any, Optional, Tuple
+from collections import deque
 import json
 import asyncio
 import logging
+import time
+
+from config import settings
+from metrics import (
+    WEBSOCKET_BROADCAST_DURATION,
+    WEBSOCKET_MESSAGES_SENT,
+    WEBSOCKET_QUEUE_DROPS,
+    WEBSOCKET_SEND_FAILURES,
+)
 
 logger = logging.getLogger(__name__)
 
+# 发送队列满时的处理策略
+POLICY_DROP_OLDEST = "drop_oldest"  # 丢弃最旧的消息
+POLICY_COALESCE = "coalesce"  # 先丢弃排队中已过时的进度消息，没有时丢弃最旧的消息
+POLICY_DISCONNECT = "disconnect"  # 断开连接，由客户端重连
+OVERFLOW_POLICIES = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_DISCONNECT)
+
+# 单个连接最多订阅的房间数
+MAX_ROOMS_PER_CONNECTION = 20
+
+# 可合并的消息类型：每条都是完整快照，只有最新一条有意义
+COALESCE_TYPES = {"progress_update", "stats_update"}
+
+
+class ConnectionQueue:
+    """
+    单个连接的有界发送队列，由独立的写入任务发送
+
+    广播方只把消息放入队列，不等待网络发送，慢连接只会让自己的队列积压
+    """
+
+    def __init__(self, websocket: WebSocket, maxsize: int, policy: str):
+        self.websocket = websocket
+        self.maxsize = max(maxsize, 1)
+        self.policy = policy
+        # [((消息类型, 任务ID), 已序列化的帧)]
+        self.frames: Deque[Tuple[Tuple[Optional[str], Optional[str]], str]] = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(
+        self,
+        frame: str,
+        message_type: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> bool:
+        """放入一帧；队列满且策略为 disconnect 时返回 False"""
+        if self.closed:
+            return True
+
+        if len(self.frames) >= self.maxsize:
+            if self.policy == POLICY_DISCONNECT:
+                return False
+            key = (message_type, job_id)
+            if not (self.policy == POLICY_COALESCE and self._coalesce(key)):
+                self.frames.popleft()
+                WEBSOCKET_QUEUE_DROPS.inc(reason="drop_oldest")
+
+        self.frames.append(((message_type, job_id), frame))
+        self.ready.set()
+        return True
+
+    def _coalesce(self, key: Tuple[Optional[str], Optional[str]]) -> bool:
+        """
+        丢弃排队中已过时的进度消息，返回是否腾出了空间
+
+        新消息可合并时丢弃同一任务的所有同类消息（只保留最新一条，
+        与 RoomBatcher._merge 一样按 (类型, 任务ID) 区分），否则丢弃最旧的一条可合并消息
+        """
+        if key[0] in COALESCE_TYPES:
+            kept = deque(item for item in self.frames if item[0] != key)
+        else:
+            kept = self.frames.copy()
+            for index, ((queued_type, _), _) in enumerate(kept):
+                if queued_type in COALESCE_TYPES:
+                    del kept[index]
+                    break
+
+        dropped = len(self.frames) - len(kept)
+        if dropped:
+            self.frames = kept
+            WEBSOCKET_QUEUE_DROPS.inc(dropped, reason="coalesced")
+        return dropped > 0
+
+    async def get(self) -> str:
+        """取出下一帧，队列为空时等待"""
+        while not self.frames:
+            self.ready.clear()
+            await self.ready.wait()
+        return self.frames.popleft()[1]
+
+    def close(self):
+        """丢弃未发送的消息并停止写入任务（写入任务自身调用时不取消）"""
+        self.closed = True
+        self.frames.clear()
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
 
 class WebSocketManager:
     """WebSocket连接管理器"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: Optional[float] = None,
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+    ):
         # 活动的WebSocket连接 {connection_id: websocket}
         self.active_connections: Dict[str, WebSocket] = {}
-        # 按房间分组的连接 {room: {connection_id}}
+        # 每个连接的发送队列 {connection_id: ConnectionQueue}
+        self.queues: Dict[str, ConnectionQueue] = {}
+        # 按房间分组的连接 {room: {connection_id}}，房间为空时删除
         self.rooms: Dict[str, Set[str]] = {}
+        # 反向索引：连接订阅的房间 {connection_id: {room}}
+        self.connection_rooms: Dict[str, Set[str]] = {}
+        # 单次发送超时（秒），慢连接超时后被断开
+        self.send_timeout = (
+            send_timeout if send_timeout is not None else settings.websocket_send_timeout
+        )
+        self.queue_size = (
+            queue_size if queue_size is not None else settings.websocket_queue_size
+        )
+        policy = overflow_policy or settings.websocket_overflow_policy
+        if policy not in OVERFLOW_POLICIES:
+            logger.warning(f"未知的WebSocket队列策略 {policy}，使用 {POLICY_COALESCE}")
+            policy = POLICY_COALESCE
+        self.overflow_policy = policy
+        # 后台关闭连接的任务（保留引用，避免任务被提前回收）
+        self._close_tasks: Set[asyncio.Task] = set()
+        # 跨副本广播（websocket_bridge 启动后设置）
+        self.bridge: Optional[Any] = None
 
     async def connect(
         self, websocket: WebSocket, connection_id: str, room: str = "default"
@@ -22,12 +148,14 @@ class WebSocketManager:
         """建立WebSocket连接"""
         try:
             await websocket.accept()
+            if connection_id in self.active_connections:
+                self.disconnect(connection_id)
             self.active_connections[connection_id] = websocket
+            self.connection_rooms[connection_id] = set()
+            self._start_writer(connection_id, websocket)
 
             # 加入房间
-            if room not in self.rooms:
-                self.rooms[room] = set()
-            self.rooms[room].add(connection_id)
+            self.join_room(connection_id, room)
 
             logger.info(f"WebSocket连接建立: {connection_id} 加入房间 {room}")
 
@@ -51,64 +179,195 @@ class WebSocketManager:
     def disconnect(self, connection_id: str):
         """断开WebSocket连接"""
         if connection_id in self.active_connections:
-            # 从所有房间中移除
-            for room, connections in self.rooms.items():
-                connections.discard(connection_id)
+            # 只从连接订阅的房间中移除
+            for room in list(self.connection_rooms.get(connection_id, ())):
+                self.leave_room(connection_id, room)
+            self.connection_rooms.pop(connection_id, None)
 
-            # 移除连接
+            # 移除连接，丢弃未发送的消息
             del self.active_connections[connection_id]
+            queue = self.queues.pop(connection_id, None)
+            if queue is not None:
+                queue.close()
             logger.info(f"WebSocket连接断开: {connection_id}")
 
+    def join_room(self, connection_id: str, room: str) -> bool:
+        """连接加入房间；超过订阅上限时返回 False"""
+        rooms = self.connection_rooms.get(connection_id)
+        if rooms is None:
+            return False
+        if room not in rooms and len(rooms) >= MAX_ROOMS_PER_CONNECTION:
+            return False
+        rooms.add(room)
+        self.rooms.setdefault(room, set()).add(connection_id)
+        return True
+
+    def leave_room(self, connection_id: str, room: str):
+        """连接离开房间，房间为空时删除"""
+        rooms = self.connection_rooms.get(connection_id)
+        if rooms is not None:
+            rooms.discard(room)
+        connections = self.rooms.get(room)
+        if connections is not None:
+            connections.discard(connection_id)
+            if not connections:
+                del self.rooms[room]
+
+    async def handle_client_message(self, connection_id: str, data: str):
+        """
+        处理客户端消息
+
+        {"action": "subscribe" / "unsubscribe", "room": 房间} 订阅或退订房间，
+        其它消息按心跳处理
+        """
+        try:
+            message = json.loads(data)
+        except ValueError:
+            message = None
+        action = message.get("action") if isinstance(message, dict) else None
+        room = message.get("room") if isinstance(message, dict) else None
+
+        if action in ("subscribe", "unsubscribe") and isinstance(room, str) and room:
+            if action == "subscribe":
+                ok = self.join_room(connection_id, room)
+            else:
+                self.leave_room(connection_id, room)
+                ok = True
+            reply = {
+                "type": f"{action}d" if ok else "error",
+                "room": room,
+                "rooms": sorted(self.connection_rooms.get(connection_id, ())),
+            }
+            if not ok:
+                reply["message"] = f"最多订阅 {MAX_ROOMS_PER_CONNECTION} 个房间"
+        else:
+            reply = {"type": "heartbeat", "message": "pong"}
+
+        reply["timestamp"] = asyncio.get_event_loop().time()
+        await self.send_personal_message(connection_id, reply)
+
     async def send_personal_message(self, connection_id: str, message: Dict[str, Any]):
         """向特定连接发送消息"""
         if connection_id in self.active_connections:
-            websocket = self.active_connections[connection_id]
-            try:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
-            except WebSocketDisconnect:
-                self.disconnect(connection_id)
-            except Exception as e:
-                logger.error(f"发送消息失败: {e}")
-                self.disconnect(connection_id)
+            self._fan_out(
+                [connection_id],
+                self._serialize(message),
+                message.get("type"),
+                message.get("job_id"),
+            )
 
     async def broadcast_to_room(self, room: str, message: Dict[str, Any]):
-        """向房间中的所有连接广播消息"""
-        if room in self.rooms:
-            disconnected_connections = []
-
-            for connection_id in self.rooms[room]:
-                if connection_id in self.active_connections:
-                    websocket = self.active_connections[connection_id]
-                    try:
-                        await websocket.send_text(
-                            json.dumps(message, ensure_ascii=False)
-                        )
-                    except WebSocketDisconnect:
-                        disconnected_connections.append(connection_id)
-                    except Exception as e:
-                        logger.error(f"广播消息失败: {e}")
-                        disconnected_connections.append(connection_id)
-
-            # 清理断开的连接
-            for connection_id in disconnected_connections:
-                self.disconnect(connection_id)
+        """向房间中的所有连接广播消息（启用跨副本广播时同时转发给其它副本）"""
+        frame = self._serialize(message)
+        message_type, job_id = message.get("type"), message.get("job_id")
+        self.deliver(room, frame, message_type, job_id)
+        # 让出一次事件循环，跟得上的连接在下一次广播前就能发出本帧，
+        # 队列溢出策略只作用于真正的慢连接
+        await asyncio.sleep(0)
+        if self.bridge is not None:
+            await self.bridge.publish(room, frame, message_type, job_id)
 
     async def broadcast_to_all(self, message: Dict[str, Any]):
-        """向所有连接广播消息"""
-        disconnected_connections = []
-
-        for connection_id, websocket in self.active_connections.items():
-            try:
-                await websocket.send_text(json.dumps(message, ensure_ascii=False))
-            except WebSocketDisconnect:
-                disconnected_connections.append(connection_id)
-            except Exception as e:
-                logger.error(f"广播消息失败: {e}")
-                disconnected_connections.append(connection_id)
-
-        # 清理断开的连接
-        for connection_id in disconnected_connections:
+        """向所有连接广播消息（启用跨副本广播时同时转发给其它副本）"""
+        frame = self._serialize(message)
+        message_type, job_id = message.get("type"), message.get("job_id")
+        self.deliver(None, frame, message_type, job_id)
+        await asyncio.sleep(0)
+        if self.bridge is not None:
+            await self.bridge.publish(None, frame, message_type, job_id)
+
+    def deliver(
+        self,
+        room: Optional[str],
+        frame: str,
+        message_type: Optional[str],
+        job_id: Optional[str] = None,
+    ):
+        """把已序列化的帧发给本进程中房间内的连接（room 为 None 时发给所有连接）"""
+        if room is None:
+            self._fan_out(self.active_connections, frame, message_type, job_id)
+        elif room in self.rooms:
+            self._fan_out(self.rooms[room], frame, message_type, job_id)
+
+    def _serialize(self, message: Dict[str, Any]) -> str:
+        """每条消息只序列化一次，所有连接共用同一帧"""
+        return json.dumps(message, ensure_ascii=False)
+
+    def _fan_out(
+        self,
+        connection_ids: Iterable[str],
+        frame: str,
+        message_type: Optional[str],
+        job_id: Optional[str] = None,
+    ):
+        """
+        把同一帧放入多个连接的发送队列
+
+        只入队不等待发送；队列满且策略为 disconnect 的连接直接断开
+        """
+        start_time = time.perf_counter()
+        overflowed: List[str] = []
+        for connection_id in list(connection_ids):
+            queue = self.queues.get(connection_id)
+            if queue is not None and not queue.put(frame, message_type, job_id):
+                overflowed.append(connection_id)
+        WEBSOCKET_BROADCAST_DURATION.observe(time.perf_counter() - start_time)
+
+        for connection_id in overflowed:
+            queue = self.queues[connection_id]
+            self._drop_connection(connection_id, queue, "queue_full")
+        if overflowed:
+            logger.warning(f"{len(overflowed)} 个WebSocket连接发送队列已满，已断开")
+
+    def _start_writer(self, connection_id: str, websocket: WebSocket):
+        """为连接创建发送队列和写入任务"""
+        queue = ConnectionQueue(websocket, self.queue_size, self.overflow_policy)
+        queue.writer = asyncio.create_task(self._writer(connection_id, queue))
+        self.queues[connection_id] = queue
+
+    async def _writer(self, connection_id: str, queue: ConnectionQueue):
+        """依次发送队列中的帧，发送失败时断开连接"""
+        while not queue.closed:
+            frame = await queue.get()
+            error = await self._send_frame(queue.websocket, frame)
+            if error is not None:
+                self._drop_connection(connection_id, queue, error)
+                logger.warning(f"WebSocket连接 {connection_id} 发送失败（{error}），已断开")
+                return
+            WEBSOCKET_MESSAGES_SENT.inc()
+
+    def _drop_connection(self, connection_id: str, queue: ConnectionQueue, reason: str):
+        """断开出错的连接并在后台关闭 socket"""
+        WEBSOCKET_SEND_FAILURES.inc(reason=reason)
+        # 只断开出错的那个连接（期间可能已用相同ID重连）
+        if self.queues.get(connection_id) is queue:
             self.disconnect(connection_id)
+        queue.close()
+        task = asyncio.create_task(self._close_quietly(queue.websocket))
+        self._close_tasks.add(task)
+        task.add_done_callback(self._close_tasks.discard)
+
+    async def _send_frame(self, websocket: WebSocket, frame: str) -> Optional[str]:
+        """发送一帧，成功返回 None，失败返回原因（timeout / disconnected / error）"""
+        try:
+            # asyncio.timeout 在写入任务内直接发送（wait_for 会为每帧额外创建一个任务）
+            async with asyncio.timeout(self.send_timeout):
+                await websocket.send_text(frame)
+            return None
+        except asyncio.TimeoutError:
+            return "timeout"
+        except WebSocketDisconnect:
+            return "disconnected"
+        except Exception as e:
+            logger.debug(f"发送消息失败: {e}")
+            return "error"
+
+    async def _close_quietly(self, websocket: WebSocket):
+        """关闭被断开的连接，忽略关闭时的错误"""
+        try:
+            await asyncio.wait_for(websocket.close(code=1011), timeout=self.send_timeout)
+        except Exception:
+            pass
 
     def get_room_connections(self, room: str) -> Set[str]:
         """获取房间中的连接数"""
@@ -118,17 +377,135 @@ class WebSocketManager:
         """获取总连接数"""
         return len(self.active_connections)
 
+    def get_queue_depths(self) -> List[int]:
+        """各连接发送队列中待发送的消息数"""
+        return [len(queue) for queue in self.queues.values()]
+
 
 # 全局WebSocket管理器实例
 websocket_manager = WebSocketManager()
 
 
+class RoomBatcher:
+    """
+    按房间合并进度事件并限速
+
+    刷新间隔内的事件合并为一个 batch 帧（只有一条时直接发送原消息），
+    过时的快照类事件只保留最新一条，连续的 LLM 增量拼接为一条，
+    每个房间每秒最多发送 max_fps 帧
+    """
+
+    def __init__(self, manager: WebSocketManager, max_fps: Optional[float] = None):
+        self.manager = manager
+        max_fps = max_fps if max_fps is not None else settings.websocket_room_max_fps
+        self.interval = 1 / max_fps if max_fps > 0 else 0
+        # 待发送的事件 {room: [message]}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        # 上次发送时间 {room: monotonic 时间}
+        self._last_flush: Dict[str, float] = {}
+        # 等待下次发送的任务 {room: task}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+
+    async def publish(self, room: str, message: Dict[str, Any]):
+        """加入房间的待发送事件；距上次发送已超过刷新间隔时立即发送"""
+        if self.interval <= 0:
+            await self.manager.broadcast_to_room(room, message)
+            return
+
+        self._merge(self._pending.setdefault(room, []), message)
+        if room in self._flush_tasks:
+            return
+
+        delay = self._last_flush.get(room, 0) + self.interval - time.monotonic()
+        if delay <= 0:
+            await self._flush(room)
+        else:
+            task = asyncio.create_task(self._flush_later(room, delay))
+            self._flush_tasks[room] = task
+
+    async def flush_all(self):
+        """立即发送所有房间的待发送事件（应用关闭时调用）"""
+        for task in list(self._flush_tasks.values()):
+            task.cancel()
+        self._flush_tasks.clear()
+        for room in list(self._pending):
+            await self._flush(room)
+
+    def _merge(self, pending: List[Dict[str, Any]], message: Dict[str, Any]):
+        """合并到待发送列表：快照类事件替换同一任务的旧事件，LLM 增量拼接到同源的上一条"""
+        message_type = message.get("type")
+        if message_type in COALESCE_TYPES:
+            pending[:] = [
+                item
+                for item in pending
+                if item.get("type") != message_type
+                or item.get("job_id") != message.get("job_id")
+            ]
+        elif message_type == "llm_delta":
+            for index in range(len(pending) - 1, -1, -1):
+                last = pending[index]
+                if last.get("type") == "llm_delta" and all(
+                    last.get(key) == message.get(key)
+                    for key in ("source", "job_id", "extra_data")
+                ):
+                    pending[index] = {
+                        **message,
+                        "delta": last.get("delta", "") + message.get("delta", ""),
+                    }
+                    return
+        pending.append(message)
+
+    async def _flush_later(self, room: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._flush_tasks.pop(room, None)
+        await self._flush(room)
+
+    async def _flush(self, room: str):
+        messages = self._pending.pop(room, None)
+        if not messages:
+            return
+
+        now = time.monotonic()
+        # 清理已过刷新间隔的房间记录（任务房间用完即弃）
+        self._last_flush = {
+            key: value
+            for key, value in self._last_flush.items()
+            if now - value < self.interval
+        }
+        self._last_flush[room] = now
+
+        if len(messages) == 1:
+            frame = messages[0]
+        else:
+            frame = {
+                "type": "batch",
+                "messages": messages,
+                "timestamp": asyncio.get_event_loop().time(),
+            }
+        await self.manager.broadcast_to_room(room, frame)
+
+
+# 全局进度事件合并器
+room_batcher = RoomBatcher(websocket_manager)
+
+
 class ProgressReporter:
-    """进度报告器 - 用于在采集过程中发送实时进度"""
+    """进度报告器 - 用于在采集过程中发送实时进度（经 room_batcher 合并限速）"""
 
-    def __init__(self, room: str = "cursor_collection"):
+    def __init__(self, room: str = "cursor_collection", job_id: Optional[str] = None):
         self.room = room
+        self.job_id = job_id
         self.manager = websocket_manager
+        self.batcher = room_batcher
+
+    async def _broadcast(self, message: Dict[str, Any]):
+        """发送到采集房间；属于后台任务时附带任务ID，并同时发送到任务房间 job_{job_id}"""
+        if self.job_id:
+            message["job_id"] = self.job_id
+            await self.batcher.publish(f"job_{self.job_id}", message)
+        await self.batcher.publish(self.room, message)
 
     async def report_progress(
         self, current: int, total: int, message: str, extra_data: Optional[Dict] = None
@@ -144,7 +521,7 @@ class ProgressReporter:
             "extra_data": extra_data or {},
         }
 
-        await self.manager.broadcast_to_room(self.room, progress_data)
+        await self._broadcast(progress_data)
 
     async def report_status(
         self, status: str, message: str, data: Optional[Dict] = None
@@ -158,7 +535,7 @@ class ProgressReporter:
             "data": data or {},
         }
 
-        await self.manager.broadcast_to_room(self.room, status_data)
+        await self._broadcast(status_data)
 
     async def report_version_progress(
         self,
@@ -179,7 +556,7 @@ class ProgressReporter:
             "timestamp": asyncio.get_event_loop().time(),
         }
 
-        await self.manager.broadcast_to_room(self.room, version_data)
+        await self._broadcast(version_data)
 
     async def report_stats(self, stats: Dict):
         """报告统计信息"""
@@ -189,4 +566,28 @@ class ProgressReporter:
             "timestamp": asyncio.get_event_loop().time(),
         }
 
-        await self.manager.broadcast_to_room(self.room, stats_data)
+        await self._broadcast(stats_data)
+
+    async def report_llm_delta(
+        self, source: str, delta: str, extra_data: Optional[Dict] = None
+    ):
+        """转发 LLM 流式输出的增量内容"""
+        delta_data = {
+            "type": "llm_delta",
+            "source": source,  # "cursor", "ai_news"
+            "delta": delta,
+            "timestamp": asyncio.get_event_loop().time(),
+            "extra_data": extra_data or {},
+        }
+
+        await self._broadcast(delta_data)
+
+    async def report_item(self, item: Dict):
+        """报告流式解析出的单条结果（如一条 AI 新闻）"""
+        item_data = {
+            "type": "item_ready",
+            "item": item,
+            "timestamp": asyncio.get_event_loop().time(),
+        }
+
+        await self._broadcast(item_data)
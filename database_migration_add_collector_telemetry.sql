@@ -0,0 +1,27 @@
+-- 数据库迁移脚本：为收集器运行记录添加遥测字段
+-- 描述：collector_logs 记录每次运行的阶段耗时（fetch / parse / llm / persist）、
+--       LLM 调用次数、缓存命中和错误，供 /api/v1/collectors/runs 和 /latency 使用
+
+-- 添加遥测字段
+ALTER TABLE collector_logs
+ADD COLUMN started_at DATETIME COMMENT '开始时间' AFTER execution_time,
+ADD COLUMN duration_ms INT COMMENT '总耗时(毫秒)' AFTER started_at,
+ADD COLUMN fetch_ms INT DEFAULT 0 COMMENT '抓取阶段耗时(毫秒)' AFTER duration_ms,
+ADD COLUMN parse_ms INT DEFAULT 0 COMMENT '解析阶段耗时(毫秒)' AFTER fetch_ms,
+ADD COLUMN llm_ms INT DEFAULT 0 COMMENT 'LLM 阶段累计耗时(毫秒)' AFTER parse_ms,
+ADD COLUMN persist_ms INT DEFAULT 0 COMMENT '保存阶段耗时(毫秒)' AFTER llm_ms,
+ADD COLUMN api_calls INT DEFAULT 0 COMMENT 'LLM API 调用次数' AFTER persist_ms,
+ADD COLUMN cache_hits INT DEFAULT 0 COMMENT 'LLM 缓存命中次数' AFTER api_calls,
+ADD COLUMN error_count INT DEFAULT 0 COMMENT '错误数' AFTER cache_hits,
+ADD COLUMN errors JSON COMMENT '错误信息列表' AFTER error_count;
+
+-- 已有记录用 execution_time 估算总耗时
+UPDATE collector_logs
+SET duration_ms = execution_time * 1000
+WHERE duration_ms IS NULL AND execution_time IS NOT NULL;
+
+-- 运行历史按收集器筛选、按时间倒序
+CREATE INDEX idx_collector_logs_name_created_at ON collector_logs(collector_name, created_at);
+
+-- 显示表结构
+DESCRIBE collector_logs;
@@ -0,0 +1,11 @@
+-- 数据库迁移脚本：为列表接口添加 keyset 分页索引
+-- 描述：/api/v1/cursor/updates 按 (release_date, id)、/api/v1/news/ 按 (published_at, id) 倒序翻页，
+--       复合索引让每一页都只需从上一页末尾开始扫描，不再依赖 OFFSET
+
+-- 创建复合索引（新建的数据库由 create_all 自动创建）
+CREATE INDEX idx_cursor_updates_release_date_id ON cursor_updates(release_date, id);
+CREATE INDEX idx_news_articles_published_at_id ON news_articles(published_at, id);
+
+-- 验证索引
+SHOW INDEX FROM cursor_updates WHERE Key_name = 'idx_cursor_updates_release_date_id';
+SHOW INDEX FROM news_articles WHERE Key_name = 'idx_news_articles_published_at_id';